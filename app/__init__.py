@@ -0,0 +1,6 @@
+def __getattr__(name):
+    """Resolve database helpers on first access so importing app alone does not load SQLAlchemy"""
+    if name in ("init_db", "engine"):
+        from app.core import database
+        return getattr(database, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
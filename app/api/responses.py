@@ -0,0 +1,6 @@
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+def model_response(data, adapter: TypeAdapter) -> Response:
+    """Serialize already-validated response models in one call, skipping FastAPI's response_model re-validation"""
+    return Response(content=adapter.dump_json(data), media_type="application/json")
@@ -2,12 +2,13 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, bindparam
 from sqlalchemy.orm import selectinload
 import logging
 import json
 
 from app.core.database import get_db
+from app.core.cache import response_cache
 from app.models.database_models import Wall
 from app.models.pydantic_models import TrajectoryPlanRequest, PlanningResult, AlgorithmsResponse, AlgorithmInfo
 from app.services.path_planning import PathPlanningService
@@ -15,10 +16,15 @@ from app.services.path_planning import PathPlanningService
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Shared planning service - built once at import, reused across requests
+planning_service = PathPlanningService()
+
+# Prebuilt once; only the bound wall_id varies per request
+WALL_WITH_OBSTACLES = select(Wall).where(Wall.id == bindparam("wall_id")).options(selectinload(Wall.obstacles))
+
 async def get_wall_with_obstacles(db: AsyncSession, wall_id: int):
     """Get wall with obstacles or raise 404"""
-    wall_query = select(Wall).where(Wall.id == wall_id).options(selectinload(Wall.obstacles))
-    wall = await db.scalar(wall_query)
+    wall = await db.scalar(WALL_WITH_OBSTACLES, {"wall_id": wall_id})
     if not wall:
         raise HTTPException(status_code=404, detail="Wall not found")
     return wall
@@ -44,13 +50,13 @@ async def plan_trajectory(request: TrajectoryPlanRequest, db: AsyncSession = Dep
         
         # Plan trajectory
         try:
-            planning_service = PathPlanningService()
             result = await planning_service.plan_trajectory(db, wall, request)
             
             if not isinstance(result, PlanningResult):
                 logger.error(f"Planning service returned incorrect type: {type(result)}")
                 raise HTTPException(status_code=500, detail="Internal error: Invalid response type from planning service")
             
+            response_cache.clear("trajectories")
             logger.info(f"Successfully planned trajectory {result.trajectory_id} for wall {request.wall_id}")
             logger.info(f"Metrics: {result.total_points} points, {result.total_length:.2f}m, {result.coverage_percentage:.1f}% coverage")
             return result
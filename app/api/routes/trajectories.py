@@ -1,44 +1,105 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, desc, text, bindparam
+from sqlalchemy.orm import selectinload, raiseload
 import logging
+import orjson
 
 from app.core.database import get_db
+from app.core.cache import response_cache
+from app.api.responses import model_response
 from app.models.database_models import Trajectory, TrajectoryPoint, Wall
-from app.models.pydantic_models import TrajectoryResponse, TrajectoryPointResponse
+from app.models.pydantic_models import (
+    TrajectoryResponse, TrajectoryPointResponse, TRAJECTORY_RESPONSE_ADAPTER, TRAJECTORY_LIST_ADAPTER
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Per-segment lengths via LAG over the point sequence; only aggregates leave SQLite
+TRAJECTORY_STATS_SQL = text("""
+    WITH p AS (
+        SELECT tool_active,
+               SQRT((x - LAG(x) OVER w) * (x - LAG(x) OVER w) +
+                    (y - LAG(y) OVER w) * (y - LAG(y) OVER w) +
+                    (z - LAG(z) OVER w) * (z - LAG(z) OVER w)) AS segment_length
+        FROM trajectory_points
+        WHERE trajectory_id = :trajectory_id
+        WINDOW w AS (ORDER BY sequence_number)
+    )
+    SELECT COUNT(*) AS total_points,
+           SUM(CASE WHEN tool_active THEN 1 ELSE 0 END) AS cutting_points,
+           COALESCE(SUM(segment_length), 0.0) AS total_length,
+           COALESCE(SUM(CASE WHEN tool_active THEN segment_length END), 0.0) AS cutting_length
+    FROM p
+""")
+
+# Prebuilt lookups, reused across requests
+TRAJECTORY_BY_ID = select(Trajectory).where(Trajectory.id == bindparam("trajectory_id")).options(raiseload("*"))
+TRAJECTORY_BY_ID_WITH_POINTS = select(Trajectory).where(Trajectory.id == bindparam("trajectory_id")).options(
+    selectinload(Trajectory.points), raiseload("*"))
+
 async def get_trajectory_or_404(db: AsyncSession, trajectory_id: int, include_points: bool = False):
     """Get trajectory by ID or raise 404"""
-    query = select(Trajectory).where(Trajectory.id == trajectory_id)
-    if include_points:
-        query = query.options(selectinload(Trajectory.points))
-    
-    trajectory = await db.scalar(query)
+    query = TRAJECTORY_BY_ID_WITH_POINTS if include_points else TRAJECTORY_BY_ID
+    trajectory = await db.scalar(query, {"trajectory_id": trajectory_id})
     if not trajectory:
         raise HTTPException(status_code=404, detail="Trajectory not found")
     return trajectory
 
-def handle_error(operation: str, trajectory_id: int = None):
-    """Handle errors with consistent logging and HTTP exceptions"""
-    def decorator(func):
-        async def wrapper(*args, **kwargs):
-            try:
-                return await func(*args, **kwargs)
-            except HTTPException:
-                raise
-            except Exception as e:
-                error_msg = f"Failed to {operation}"
-                if trajectory_id:
-                    error_msg += f" {trajectory_id}"
-                logger.error(f"{error_msg}: {str(e)}")
-                raise HTTPException(status_code=500, detail=error_msg)
-        return wrapper
-    return decorator
+# Columns fetched per point by the point endpoints (plain rows, no ORM hydration)
+POINT_COLUMNS = (TrajectoryPoint.sequence_number, TrajectoryPoint.x, TrajectoryPoint.y, TrajectoryPoint.z,
+                 TrajectoryPoint.tool_active)
+DETAILED_POINT_COLUMNS = tuple(getattr(TrajectoryPoint, field) for field in TrajectoryPointResponse.model_fields)
+
+TRAJECTORY_FIELDS = tuple(field for field in TrajectoryResponse.model_fields if field != "points")
+POINT_FIELDS = tuple(TrajectoryPointResponse.model_fields)
+
+def build_trajectory_response(trajectory: Trajectory, include_points: bool = False) -> TrajectoryResponse:
+    """Build the response from already-typed ORM values with model_construct, skipping validators"""
+    points = [
+        TrajectoryPointResponse.model_construct(**{field: getattr(point, field) for field in POINT_FIELDS})
+        for point in trajectory.points
+    ] if include_points else []
+    return TrajectoryResponse.model_construct(
+        **{field: getattr(trajectory, field) for field in TRAJECTORY_FIELDS}, points=points
+    )
+
+def point_page_filter(trajectory_id: int, start_sequence: int, after_sequence: Optional[int]):
+    """Keyset filter for a page of points: after the last seen sequence, else from start_sequence"""
+    if after_sequence is not None:
+        return and_(TrajectoryPoint.trajectory_id == trajectory_id, TrajectoryPoint.sequence_number > after_sequence)
+    return and_(TrajectoryPoint.trajectory_id == trajectory_id, TrajectoryPoint.sequence_number >= start_sequence)
+
+# Rows pulled from the cursor and encoded per chunk of the streamed body
+POINT_BATCH_SIZE = 500
+
+async def stream_points(points, description: str, trajectory_id: int) -> StreamingResponse:
+    """Stream column rows from a DB cursor as a JSON array, encoding one batch at a time
+
+    The first batch is fetched before the response starts, so errors opening the cursor still
+    reach the route's error handling; later failures can only be logged and abort the stream.
+    """
+    batch = await points.fetchmany(POINT_BATCH_SIZE)
+    
+    async def generate():
+        nonlocal batch
+        count = 0
+        try:
+            yield b"["
+            while batch:
+                encoded = b",".join(orjson.dumps(point._asdict()) for point in batch)
+                yield b"," + encoded if count else encoded
+                count += len(batch)
+                batch = await points.fetchmany(POINT_BATCH_SIZE)
+            yield b"]"
+        except Exception as e:
+            logger.error(f"Failed while streaming {description} for trajectory {trajectory_id}: {str(e)}")
+            raise
+        logger.info(f"Retrieved {count} {description} for trajectory {trajectory_id}")
+    return StreamingResponse(generate(), media_type="application/json")
 
 @router.get("/trajectories", response_model=List[TrajectoryResponse])
 async def get_trajectories(wall_id: Optional[int] = Query(None), status: Optional[str] = Query(None),
@@ -46,7 +107,13 @@ async def get_trajectories(wall_id: Optional[int] = Query(None), status: Optiona
                           limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_db)):
     """Get trajectories with optional filtering"""
     try:
-        query = select(Trajectory)
+        cache_key = ("list", wall_id, status, algorithm, skip, limit)
+        cached = response_cache.get("trajectories", cache_key)
+        if cached is not None:
+            return model_response(cached, TRAJECTORY_LIST_ADAPTER)
+        generation = response_cache.generation("trajectories")
+        
+        query = select(Trajectory).options(raiseload("*"))
         
         # Apply filters
         filters = []
@@ -61,9 +128,10 @@ async def get_trajectories(wall_id: Optional[int] = Query(None), status: Optiona
             query = query.where(and_(*filters))
         
         trajectories = await db.scalars(query.offset(skip).limit(limit).order_by(desc(Trajectory.created_at)))
-        result = trajectories.all()
+        result = [build_trajectory_response(trajectory) for trajectory in trajectories.all()]
+        response_cache.set("trajectories", cache_key, result, generation)
         logger.info(f"Retrieved {len(result)} trajectories")
-        return result
+        return model_response(result, TRAJECTORY_LIST_ADAPTER)
     except Exception as e:
         logger.error(f"Failed to get trajectories: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve trajectories")
@@ -73,9 +141,7 @@ async def get_trajectory(trajectory_id: int, include_points: bool = Query(False)
     """Get a specific trajectory by ID"""
     try:
         trajectory = await get_trajectory_or_404(db, trajectory_id, include_points)
-        if not include_points:
-            trajectory.points = []
-        return trajectory
+        return model_response(build_trajectory_response(trajectory, include_points), TRAJECTORY_RESPONSE_ADAPTER)
     except HTTPException:
         raise
     except Exception as e:
@@ -84,38 +150,38 @@ async def get_trajectory(trajectory_id: int, include_points: bool = Query(False)
 
 @router.get("/trajectories/{trajectory_id}/points")
 async def get_trajectory_points(trajectory_id: int, start_sequence: int = Query(0, ge=0),
+                               after_sequence: Optional[int] = Query(None, ge=-1),
                                limit: int = Query(1000, ge=1, le=10000), db: AsyncSession = Depends(get_db)):
     """Get trajectory points with pagination - Returns format expected by frontend"""
     try:
         await get_trajectory_or_404(db, trajectory_id)  # Verify trajectory exists
         
-        points = await db.scalars(select(TrajectoryPoint).where(
-            and_(TrajectoryPoint.trajectory_id == trajectory_id, TrajectoryPoint.sequence_number >= start_sequence)
+        points = await db.stream(select(*POINT_COLUMNS).where(
+            point_page_filter(trajectory_id, start_sequence, after_sequence)
         ).order_by(TrajectoryPoint.sequence_number).limit(limit))
         
-        points_data = [{"x": p.x, "y": p.y, "z": p.z, "tool_active": p.tool_active} for p in points]
-        logger.info(f"Retrieved {len(points_data)} trajectory points for trajectory {trajectory_id}")
-        return points_data
+        return await stream_points(points, "trajectory points", trajectory_id)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to get trajectory points {trajectory_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve trajectory points")
 
-@router.get("/trajectories/{trajectory_id}/points-detailed", response_model=List[TrajectoryPointResponse])
+# Streamed, so the response model only documents the schema; rows are encoded straight from the cursor
+@router.get("/trajectories/{trajectory_id}/points-detailed", response_model=None,
+            responses={200: {"model": List[TrajectoryPointResponse]}})
 async def get_trajectory_points_detailed(trajectory_id: int, start_sequence: int = Query(0, ge=0),
+                                        after_sequence: Optional[int] = Query(None, ge=-1),
                                         limit: int = Query(1000, ge=1, le=10000), db: AsyncSession = Depends(get_db)):
     """Get detailed trajectory points with all fields"""
     try:
         await get_trajectory_or_404(db, trajectory_id)  # Verify trajectory exists
         
-        points = await db.scalars(select(TrajectoryPoint).where(
-            and_(TrajectoryPoint.trajectory_id == trajectory_id, TrajectoryPoint.sequence_number >= start_sequence)
+        points = await db.stream(select(*DETAILED_POINT_COLUMNS).where(
+            point_page_filter(trajectory_id, start_sequence, after_sequence)
         ).order_by(TrajectoryPoint.sequence_number).limit(limit))
         
-        result = points.all()
-        logger.info(f"Retrieved {len(result)} detailed trajectory points for trajectory {trajectory_id}")
-        return result
+        return await stream_points(points, "detailed trajectory points", trajectory_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -126,11 +192,15 @@ async def get_trajectory_points_detailed(trajectory_id: int, start_sequence: int
 async def delete_trajectory(trajectory_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a trajectory and all its points"""
     try:
-        trajectory = await get_trajectory_or_404(db, trajectory_id)
+        # Plain lookup: the delete cascade has to load points, which raiseload would block
+        trajectory = await db.get(Trajectory, trajectory_id)
+        if not trajectory:
+            raise HTTPException(status_code=404, detail="Trajectory not found")
         trajectory_name = trajectory.name or f"Trajectory {trajectory.id}"
         
         await db.delete(trajectory)
         await db.commit()
+        response_cache.clear("trajectories")
         logger.info(f"Deleted trajectory {trajectory_id}: {trajectory_name}")
         return {"message": "Trajectory deleted successfully"}
     except HTTPException:
@@ -144,30 +214,21 @@ async def delete_trajectory(trajectory_id: int, db: AsyncSession = Depends(get_d
 async def get_trajectory_stats(trajectory_id: int, db: AsyncSession = Depends(get_db)):
     """Get detailed statistics for a trajectory"""
     try:
-        trajectory = await get_trajectory_or_404(db, trajectory_id)
+        cached = response_cache.get("trajectories", ("stats", trajectory_id))
+        if cached is not None:
+            return cached
+        generation = response_cache.generation("trajectories")
         
-        points = await db.scalars(select(TrajectoryPoint).where(
-            TrajectoryPoint.trajectory_id == trajectory_id
-        ).order_by(TrajectoryPoint.sequence_number))
-        points_list = points.all()
+        trajectory = await get_trajectory_or_404(db, trajectory_id)
         
-        # Calculate statistics
-        total_points = len(points_list)
-        cutting_points = sum(1 for p in points_list if p.tool_active)
+        # Aggregate counts and segment lengths in SQLite so only one row comes back
+        stats = (await db.execute(TRAJECTORY_STATS_SQL, {"trajectory_id": trajectory_id})).one()
+        total_points, cutting_points = stats.total_points, stats.cutting_points or 0
         rapid_points = total_points - cutting_points
+        total_length, cutting_length = float(stats.total_length), float(stats.cutting_length)
+        rapid_length = total_length - cutting_length
         
-        # Calculate path lengths
-        total_length = cutting_length = rapid_length = 0.0
-        for i in range(1, len(points_list)):
-            prev, curr = points_list[i-1], points_list[i]
-            distance = ((curr.x - prev.x)**2 + (curr.y - prev.y)**2 + (curr.z - prev.z)**2)**0.5
-            total_length += distance
-            if curr.tool_active:
-                cutting_length += distance
-            else:
-                rapid_length += distance
-        
-        return {
+        result = {
             "trajectory_id": trajectory_id, "algorithm": trajectory.algorithm,
             "total_points": total_points, "cutting_points": cutting_points, "rapid_points": rapid_points,
             "total_length": total_length, "cutting_length": cutting_length, "rapid_length": rapid_length,
@@ -175,6 +236,8 @@ async def get_trajectory_stats(trajectory_id: int, db: AsyncSession = Depends(ge
             "estimated_duration_minutes": trajectory.estimated_duration_minutes, "robot_width": trajectory.robot_width,
             "overlap_percentage": trajectory.overlap_percentage, "resolution": trajectory.resolution
         }
+        response_cache.set("trajectories", ("stats", trajectory_id), result, generation)
+        return result
     except HTTPException:
         raise
     except Exception as e:
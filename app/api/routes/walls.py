@@ -2,45 +2,40 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, insert, update, and_, bindparam, func
+from sqlalchemy.orm import selectinload, raiseload, load_only
+from sqlalchemy.orm.attributes import set_committed_value
 import logging
-import json
 
 from app.core.database import get_db
+from app.core.cache import response_cache
+from app.api.responses import model_response
 from app.models.database_models import Wall, Obstacle
 from app.models.pydantic_models import (
-    WallCreate, WallResponse, WallUpdate, ObstacleCreate, ObstacleResponse, ErrorResponse
+    WallCreate, WallResponse, WallUpdate, ObstacleCreate, ObstacleResponse, ErrorResponse,
+    WALL_RESPONSE_ADAPTER, WALL_LIST_ADAPTER, OBSTACLE_LIST_ADAPTER
 )
 from app.utils.geometry import GeometryUtils
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Statements built once at import so each request skips construction and hits the compiled cache
+# Obstacles load only the columns ObstacleResponse serializes; anything added later stays deferred
+OBSTACLE_RESPONSE_COLUMNS = tuple(getattr(Obstacle, field) for field in ObstacleResponse.model_fields)
+LOAD_OBSTACLES = selectinload(Wall.obstacles).load_only(*OBSTACLE_RESPONSE_COLUMNS)
+
+WALL_BY_ID = select(Wall).where(Wall.id == bindparam("wall_id"))
+WALL_BY_ID_WITH_OBSTACLES = WALL_BY_ID.options(LOAD_OBSTACLES)
+
 async def get_wall_or_404(db: AsyncSession, wall_id: int, include_obstacles: bool = False):
     """Get wall by ID or raise 404"""
-    query = select(Wall).where(Wall.id == wall_id)
-    if include_obstacles:
-        query = query.options(selectinload(Wall.obstacles))
-    
-    wall = await db.scalar(query)
+    query = WALL_BY_ID_WITH_OBSTACLES if include_obstacles else WALL_BY_ID
+    wall = await db.scalar(query, {"wall_id": wall_id})
     if not wall:
         raise HTTPException(status_code=404, detail="Wall not found")
     return wall
 
-def create_obstacle_response(obstacle):
-    """Convert obstacle to response format"""
-    obstacle_dict = obstacle.__dict__.copy()
-    obstacle_dict["geometry_data"] = json.loads(obstacle.geometry_data)
-    return ObstacleResponse(**obstacle_dict)
-
-def create_wall_response(wall):
-    """Convert wall to response format with obstacles"""
-    obstacles = [create_obstacle_response(obs) for obs in wall.obstacles]
-    wall_dict = wall.__dict__.copy()
-    wall_dict["obstacles"] = obstacles
-    return WallResponse(**wall_dict)
-
 async def handle_db_error(db: AsyncSession, operation: str, error: Exception, item_id: int = None):
     """Handle database errors with rollback"""
     logger.error(f"Failed to {operation}{f' {item_id}' if item_id else ''}: {str(error)}")
@@ -69,12 +64,12 @@ async def create_wall(wall_data: WallCreate, db: AsyncSession = Depends(get_db))
                    origin_x=wall_data.origin_x, origin_y=wall_data.origin_y)
         db.add(wall)
         await db.commit()
-        await db.refresh(wall)
-
-        # Load with obstacles (empty on creation)
-        wall = await get_wall_or_404(db, wall.id, include_obstacles=True)
+        
+        # A new wall has no obstacles; server defaults already came back via RETURNING
+        set_committed_value(wall, "obstacles", [])
+        response_cache.clear("walls")
         logger.info(f"Created wall {wall.id}: {wall.name}")
-        return create_wall_response(wall)
+        return WallResponse.model_validate(wall)
     except Exception as e:
         await handle_db_error(db, "create wall", e)
 
@@ -83,12 +78,21 @@ async def get_walls(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le
                    search: Optional[str] = Query(None), db: AsyncSession = Depends(get_db)):
     """Get all walls with optional search and pagination"""
     try:
-        query = select(Wall).options(selectinload(Wall.obstacles))
+        cache_key = ("list", skip, limit, search)
+        cached = response_cache.get("walls", cache_key)
+        if cached is not None:
+            return model_response(cached, WALL_LIST_ADAPTER)
+        generation = response_cache.generation("walls")
+        
+        # Obstacles are batch-loaded; any other lazy load is a bug, so make it raise
+        query = select(Wall).options(LOAD_OBSTACLES, raiseload("*"))
         if search:
             query = query.where(Wall.name.ilike(f"%{search}%"))
         
         walls = await db.scalars(query.offset(skip).limit(limit).order_by(Wall.created_at.desc()))
-        return [create_wall_response(wall) for wall in walls.all()]
+        result = [WallResponse.model_validate(wall) for wall in walls.all()]
+        response_cache.set("walls", cache_key, result, generation)
+        return model_response(result, WALL_LIST_ADAPTER)
     except Exception as e:
         logger.error(f"Failed to get walls: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve walls")
@@ -97,8 +101,15 @@ async def get_walls(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le
 async def get_wall(wall_id: int, db: AsyncSession = Depends(get_db)):
     """Get a specific wall by ID"""
     try:
+        cached = response_cache.get("walls", ("wall", wall_id))
+        if cached is not None:
+            return model_response(cached, WALL_RESPONSE_ADAPTER)
+        generation = response_cache.generation("walls")
+        
         wall = await get_wall_or_404(db, wall_id, include_obstacles=True)
-        return create_wall_response(wall)
+        result = WallResponse.model_validate(wall)
+        response_cache.set("walls", ("wall", wall_id), result, generation)
+        return model_response(result, WALL_RESPONSE_ADAPTER)
     except HTTPException:
         raise
     except Exception as e:
@@ -109,19 +120,24 @@ async def get_wall(wall_id: int, db: AsyncSession = Depends(get_db)):
 async def update_wall(wall_id: int, wall_data: WallUpdate, db: AsyncSession = Depends(get_db)):
     """Update a wall"""
     try:
-        wall = await get_wall_or_404(db, wall_id)
-        
         # Update fields if provided
-        update_fields = ["name", "width", "height", "origin_x", "origin_y"]
-        for field in update_fields:
-            value = getattr(wall_data, field)
-            if value is not None:
-                setattr(wall, field, value)
+        values = wall_data.model_dump(exclude_none=True)
+        if not values:
+            return WallResponse.model_validate(await get_wall_or_404(db, wall_id, include_obstacles=True))
         
+        # Single UPDATE ... RETURNING doubles as the existence check. updated_at is set inline
+        # because RETURNING does not see the AFTER UPDATE trigger's change
+        wall = await db.scalar(update(Wall).where(Wall.id == wall_id).values(**values, updated_at=func.now()).returning(Wall)
+                               .execution_options(populate_existing=True))
+        if not wall:
+            raise HTTPException(status_code=404, detail="Wall not found")
         await db.commit()
-        await db.refresh(wall)
+        
+        obstacles = await db.scalars(select(Obstacle).where(Obstacle.wall_id == wall_id))
+        set_committed_value(wall, "obstacles", obstacles.all())
+        response_cache.clear("walls")
         logger.info(f"Updated wall {wall.id}: {wall.name}")
-        return wall
+        return WallResponse.model_validate(wall)
     except HTTPException:
         raise
     except Exception as e:
@@ -135,6 +151,7 @@ async def delete_wall(wall_id: int, db: AsyncSession = Depends(get_db)):
         wall_name = wall.name
         await db.delete(wall)
         await db.commit()
+        response_cache.clear("walls", "trajectories")
         logger.info(f"Deleted wall {wall_id}: {wall_name}")
         return {"message": "Wall deleted successfully"}
     except HTTPException:
@@ -157,25 +174,64 @@ async def create_obstacle(wall_id: int, obstacle_data: ObstacleCreate, db: Async
         min_x, min_y, max_x, max_y = calculate_obstacle_bounds(obstacle_data.obstacle_type, geometry_data)
         
         obstacle = Obstacle(wall_id=wall_id, name=obstacle_data.name, obstacle_type=obstacle_data.obstacle_type,
-                           geometry_data=json.dumps(geometry_data), min_x=min_x, min_y=min_y, max_x=max_x, max_y=max_y)
+                           geometry_data=geometry_data, min_x=min_x, min_y=min_y, max_x=max_x, max_y=max_y)
         db.add(obstacle)
         await db.commit()
-        await db.refresh(obstacle)
+        response_cache.clear("walls")
         
         logger.info(f"Created obstacle {obstacle.id} on wall {wall_id}: {obstacle.name}")
-        return create_obstacle_response(obstacle)
+        return ObstacleResponse.model_validate(obstacle)
     except HTTPException:
         raise
     except Exception as e:
         await handle_db_error(db, "create obstacle", e, wall_id)
 
+@router.post("/walls/{wall_id}/obstacles/bulk", response_model=List[ObstacleResponse], status_code=201)
+async def create_obstacles_bulk(wall_id: int, obstacles_data: List[ObstacleCreate], db: AsyncSession = Depends(get_db)):
+    """Add several obstacles to a wall in a single insert"""
+    try:
+        wall = await get_wall_or_404(db, wall_id)  # Verify wall exists
+        
+        if not obstacles_data:
+            return []
+        
+        for index, obstacle_data in enumerate(obstacles_data):
+            if not GeometryUtils.validate_obstacle_geometry(obstacle_data.obstacle_type, obstacle_data.geometry_data,
+                                                            wall.width, wall.height):
+                raise HTTPException(status_code=400, detail=f"Invalid obstacle geometry at index {index}")
+        
+        # Bounding boxes for the whole batch in one vectorized pass
+        bounds = GeometryUtils.obstacle_bounds_batch([o.obstacle_type for o in obstacles_data],
+                                                     [o.geometry_data for o in obstacles_data])
+        rows = [{"wall_id": wall_id, "name": obstacle_data.name, "obstacle_type": obstacle_data.obstacle_type,
+                 "geometry_data": obstacle_data.geometry_data, "min_x": min_x, "min_y": min_y, "max_x": max_x, "max_y": max_y}
+                for obstacle_data, (min_x, min_y, max_x, max_y) in zip(obstacles_data, bounds.tolist())]
+        
+        obstacles = (await db.scalars(insert(Obstacle).returning(Obstacle), rows)).all()
+        await db.commit()
+        response_cache.clear("walls")
+        
+        logger.info(f"Created {len(obstacles)} obstacles on wall {wall_id}")
+        return [ObstacleResponse.model_validate(obstacle) for obstacle in obstacles]
+    except HTTPException:
+        raise
+    except Exception as e:
+        await handle_db_error(db, "create obstacles", e, wall_id)
+
 @router.get("/walls/{wall_id}/obstacles", response_model=List[ObstacleResponse])
 async def get_wall_obstacles(wall_id: int, db: AsyncSession = Depends(get_db)):
     """Get all obstacles for a wall"""
     try:
+        cached = response_cache.get("walls", ("obstacles", wall_id))
+        if cached is not None:
+            return model_response(cached, OBSTACLE_LIST_ADAPTER)
+        generation = response_cache.generation("walls")
+        
         await get_wall_or_404(db, wall_id)  # Verify wall exists
         obstacles = await db.scalars(select(Obstacle).where(Obstacle.wall_id == wall_id))
-        return [create_obstacle_response(obstacle) for obstacle in obstacles.all()]
+        result = [ObstacleResponse.model_validate(obstacle) for obstacle in obstacles.all()]
+        response_cache.set("walls", ("obstacles", wall_id), result, generation)
+        return model_response(result, OBSTACLE_LIST_ADAPTER)
     except HTTPException:
         raise
     except Exception as e:
@@ -193,6 +249,7 @@ async def delete_obstacle(wall_id: int, obstacle_id: int, db: AsyncSession = Dep
         obstacle_name = obstacle.name
         await db.delete(obstacle)
         await db.commit()
+        response_cache.clear("walls")
         logger.info(f"Deleted obstacle {obstacle_id} from wall {wall_id}: {obstacle_name}")
         return {"message": "Obstacle deleted successfully"}
     except HTTPException:
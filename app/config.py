@@ -27,12 +27,15 @@ class Settings(BaseSettings):
     # Performance
     MAX_TRAJECTORY_POINTS: int = 100000
     CACHE_TTL_SECONDS: int = 300
+    CACHE_MAX_ENTRIES: int = 256  # per namespace
     REQUEST_TIMEOUT_SECONDS: int = 30
     
     # Path Planning
     ROBOT_WIDTH_CM: float = 10.0
     OVERLAP_PERCENTAGE: float = 20.0
     PATH_RESOLUTION_CM: float = 1.0
+    PLANNING_CACHE_SIZE: int = 32
+    PLANNING_WORKERS: int = 4
     
     # Monitoring
     ENABLE_METRICS: bool = True
@@ -0,0 +1,56 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """Namespaced in-memory TTL cache for read-mostly endpoint payloads"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[str, "OrderedDict[Hashable, Tuple[float, Any]]"] = {}
+        self._generations: Dict[str, int] = {}
+
+    def generation(self, namespace: str) -> int:
+        """Current invalidation generation; capture it before reading the data to be cached"""
+        return self._generations.setdefault(namespace, 0)
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Any]:
+        """Return a cached value, or None if missing or expired"""
+        entries = self._entries.get(namespace)
+        entry = entries.get(key) if entries else None
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            entries.pop(key, None)
+            return None
+        entries.move_to_end(key)
+        return value
+
+    def set(self, namespace: str, key: Hashable, value: Any, generation: int):
+        """Store a value until the configured TTL elapses, evicting the least recently used entries
+
+        The value is dropped if the namespace was cleared since `generation` was captured,
+        since it may have been read before that write committed.
+        """
+        if self.ttl_seconds > 0 and generation == self._generations.get(namespace, 0):
+            entries = self._entries.setdefault(namespace, OrderedDict())
+            entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            entries.move_to_end(key)
+            # Keys include client-supplied query values, so bound each namespace
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def clear(self, *namespaces: str):
+        """Invalidate the given namespaces, or everything when none are given"""
+        for namespace in namespaces or set(self._entries) | set(self._generations):
+            self._entries.pop(namespace, None)
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        logger.debug(f"Response cache cleared: {namespaces or 'all'}")
+
+response_cache = ResponseCache(settings.CACHE_TTL_SECONDS, settings.CACHE_MAX_ENTRIES)
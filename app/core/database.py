@@ -5,9 +5,13 @@ from typing import AsyncGenerator
 from sqlalchemy import create_engine, event, MetaData, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+import orjson
+import math
 import os
+import sqlite3
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +20,10 @@ for directory in ["data/database", "logs"]:
     os.makedirs(directory, exist_ok=True)
 
 # Create async engine with optimized settings for SQLite
-engine = create_async_engine(settings.DATABASE_URL, poolclass=StaticPool, pool_pre_ping=True,
-                           pool_recycle=300, echo=settings.DEBUG, 
+engine = create_async_engine(settings.DATABASE_URL, poolclass=AsyncAdaptedQueuePool,
+                           pool_size=settings.DATABASE_POOL_SIZE, max_overflow=settings.DATABASE_MAX_OVERFLOW,
+                           pool_pre_ping=True, pool_recycle=300, echo=settings.DEBUG,
+                           json_serializer=lambda value: orjson.dumps(value).decode(), json_deserializer=orjson.loads,
                            connect_args={"check_same_thread": False, "timeout": 30})
 
 # Session factory
@@ -27,6 +33,23 @@ AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_co
 Base = declarative_base()
 metadata = MetaData()
 
+def _sqlite_has_sqrt() -> bool:
+    """Whether the linked SQLite was built with SQLITE_ENABLE_MATH_FUNCTIONS"""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("SELECT SQRT(4)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+SQLITE_HAS_SQRT = _sqlite_has_sqrt()
+
+def _sqrt(value):
+    """SQRT fallback; NULL in, NULL out like the built-in"""
+    return None if value is None else math.sqrt(value)
+
 @event.listens_for(engine.sync_engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     """Optimize SQLite for performance and concurrency"""
@@ -39,12 +62,14 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
             "PRAGMA cache_size=-64000",     # 64MB cache
             "PRAGMA temp_store=MEMORY",     # Use memory for temp
             "PRAGMA mmap_size=268435456",   # 256MB memory map
-            "PRAGMA optimize",              # Query planner optimization
             "PRAGMA analysis_limit=1000",   # Better statistics
             "PRAGMA busy_timeout=30000"     # 30 second timeout
         ]
         for pragma in pragmas:
             cursor.execute(pragma)
+        # Trajectory stats need SQRT, which SQLite only ships with its math functions enabled
+        if not SQLITE_HAS_SQRT:
+            dbapi_connection.create_function("SQRT", 1, _sqrt, deterministic=True)
         logger.info("SQLite pragmas configured successfully")
     except Exception as e:
         logger.error(f"Failed to set SQLite pragmas: {e}")
@@ -52,17 +77,44 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
         cursor.close()
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Dependency to get database session"""
+    """Dependency to get database session (write endpoints commit explicitly)"""
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
         except Exception as e:
             await session.rollback()
             logger.error(f"Database session error: {e}")
             raise
-        finally:
-            await session.close()
+
+# Bump whenever tables, indexes, triggers or migrations change so existing databases re-run init_db
+SCHEMA_VERSION = 3
+
+OBSOLETE_INDEXES = (
+    "idx_trajectory_point_spatial",
+    "idx_trajectory_points_spatial",
+    "idx_trajectory_point_sequence",
+    "idx_trajectory_points_trajectory",
+    "idx_trajectory_points_covering",
+)
+
+# Columns that held hex/text UUIDs before they became 16-byte GUID blobs
+GUID_COLUMNS = (("walls", "uuid"), ("trajectories", "uuid"), ("system_logs", "user_id"))
+
+async def migrate_text_uuids(conn):
+    """Rewrite text UUIDs as 16-byte blobs so equality lookups match legacy rows"""
+    for table, column in GUID_COLUMNS:
+        rows = (await conn.execute(text(
+            f"SELECT id, {column} FROM {table} WHERE typeof({column}) = 'text'"
+        ))).all()
+        converted = []
+        for row_id, value in rows:
+            try:
+                converted.append({"id": row_id, "value": uuid.UUID(value).bytes})
+            except ValueError:
+                logger.warning(f"Leaving non-UUID {table}.{column} value on row {row_id}")
+        if converted:
+            await conn.execute(text(f"UPDATE {table} SET {column} = :value WHERE id = :id"), converted)
+            logger.info(f"✅ Converted {len(converted)} text UUIDs in {table}.{column}")
 
 async def run_migrations():
     """Run database migration to add missing columns"""
@@ -71,16 +123,29 @@ async def run_migrations():
             logger.info("Running database migrations...")
             
             # Check if total_points column exists in trajectories table
-            result = await conn.execute(text("PRAGMA table_info(trajectories);"))
-            columns = [row[1] for row in result.fetchall()]
+            result = await conn.execute(text(
+                "SELECT 1 FROM pragma_table_info('trajectories') WHERE name = 'total_points' LIMIT 1"
+            ))
             
-            if 'total_points' not in columns:
+            if result.scalar() is None:
                 logger.info("Adding missing total_points column to trajectories table...")
                 await conn.execute(text("ALTER TABLE trajectories ADD COLUMN total_points INTEGER DEFAULT 0;"))
                 logger.info("✅ total_points column added successfully!")
             else:
                 logger.info("✅ total_points column already exists")
             
+            # create_all skips indexes on existing tables, so add the covering index before dropping what it replaces
+            await conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_tp_seq_cov "
+                "ON trajectory_points(trajectory_id, sequence_number, x, y, z, tool_active);"
+            ))
+            
+            # Superseded by the covering idx_tp_seq_cov; spatial point indexes only slowed bulk inserts
+            for index_name in OBSOLETE_INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index_name};"))
+            
+            await migrate_text_uuids(conn)
+            
         logger.info("Database migrations completed successfully")
     except Exception as e:
         logger.error(f"Database migration failed: {e}")
@@ -89,26 +154,42 @@ async def run_migrations():
 async def create_indexes(conn):
     """Create all database indexes for optimization"""
     indexes = [
-        ("idx_trajectory_points_spatial", "trajectory_points(x, y)"),
         ("idx_obstacles_spatial", "obstacles(min_x, min_y, max_x, max_y)"),
         ("idx_walls_dimensions", "walls(width, height)"),
         ("idx_trajectories_status", "trajectories(status, created_at)"),
-        ("idx_trajectories_wall", "trajectories(wall_id)"),
-        ("idx_trajectory_points_trajectory", "trajectory_points(trajectory_id, sequence_number)")
+        ("idx_trajectories_wall", "trajectories(wall_id)")
     ]
     
     for index_name, index_def in indexes:
         await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {index_def};"))
 
+async def create_triggers(conn):
+    """Maintain updated_at in the database instead of an ORM onupdate expression"""
+    for table in ("walls", "trajectories"):
+        await conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_updated_at AFTER UPDATE ON {table}
+            FOR EACH ROW WHEN OLD.updated_at IS NEW.updated_at
+            BEGIN
+                UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+            END;
+        """))
+
 async def init_db():
     """Initialize database with tables and indexes"""
     try:
+        async with engine.connect() as conn:
+            user_version = (await conn.execute(text("PRAGMA user_version"))).scalar()
+        if user_version == SCHEMA_VERSION:
+            logger.info(f"Database schema already at version {SCHEMA_VERSION}, skipping initialization")
+            return
+        
         async with engine.begin() as conn:
             # Create all tables
             await conn.run_sync(Base.metadata.create_all)
             
             # Create spatial indexes for geometric queries
             await create_indexes(conn)
+            await create_triggers(conn)
             
             # Analyze tables for query optimization
             await conn.execute(text("ANALYZE"))
@@ -117,12 +198,39 @@ async def init_db():
         
         # Run migrations after table creation
         await run_migrations()
+        
+        async with engine.begin() as conn:
+            await conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
         raise
 
+async def warm_up_pool(size: int = settings.DATABASE_POOL_SIZE):
+    """Pre-open pooled connections so early requests skip connect and pragma setup"""
+    connections = await asyncio.gather(*(engine.connect() for _ in range(size)))
+    await asyncio.gather(*(conn.close() for conn in connections))
+    logger.info(f"Database pool warmed with {size} connections")
+
+async def optimize_db():
+    """Refresh query planner statistics"""
+    async with engine.connect() as conn:
+        await conn.execute(text("PRAGMA optimize"))
+
+async def periodic_optimize(interval_seconds: float = settings.HEALTH_CHECK_INTERVAL * 10):
+    """Run PRAGMA optimize in the background instead of on every new connection"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await optimize_db()
+        except Exception as e:
+            logger.error(f"PRAGMA optimize failed: {e}")
+
 async def close_db():
     """Close database connections"""
+    try:
+        await optimize_db()
+    except Exception as e:
+        logger.error(f"PRAGMA optimize failed: {e}")
     await engine.dispose()
     logger.info("Database connections closed")
 
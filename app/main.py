@@ -2,47 +2,109 @@ import logging
 import time
 import uuid
 import os
+import asyncio
+import sys
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import ORJSONResponse, HTMLResponse, Response
+from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
+import orjson
 import uvicorn
 
 from app.config import settings
-from app.core.database import init_db, close_db
+from app.core.database import init_db, close_db, warm_up_pool, periodic_optimize
 from app.api.routes import walls, trajectories, planning
 
-# Setup logging
+# Setup logging - request coroutines only enqueue records; a listener thread does the I/O
+log_queue = queue.SimpleQueue()
 logging.basicConfig(
     level=getattr(logging, settings.LOG_LEVEL),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(settings.LOG_FILE) if os.path.exists(os.path.dirname(settings.LOG_FILE)) else logging.StreamHandler(),
-        logging.StreamHandler()
-    ]
+    handlers=[QueueHandler(log_queue)],
+    force=True  # run_system.py configures logging before serving this app in-process
+)
+log_listener = QueueListener(
+    log_queue,
+    logging.FileHandler(settings.LOG_FILE) if os.path.exists(os.path.dirname(settings.LOG_FILE)) else logging.StreamHandler(),
+    logging.StreamHandler()
 )
 logger = logging.getLogger(__name__)
 
+FALLBACK_HTML = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Wall Finishing Robot Control System</title>
+            <style>
+                body{font-family:Arial,sans-serif;margin:40px;background:#f5f5f5}
+                .container{background:white;padding:40px;border-radius:10px;max-width:800px;margin:0 auto}
+                h1{color:#2c3e50}
+                .info{background:#e8f4fd;padding:20px;border-radius:5px;margin:20px 0}
+                .error{background:#f8d7da;color:#721c24;padding:20px;border-radius:5px;margin:20px 0}
+                a{color:#3498db;text-decoration:none}
+                a:hover{text-decoration:underline}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <h1>🤖 Wall Finishing Robot Control System</h1>
+                <div class="error">
+                    <strong>Frontend Missing:</strong> Please place <code>index.html</code> in <code>app/static/</code>
+                </div>
+                <div class="info">
+                    <h3>🚀 System Status: Running</h3>
+                    <p>
+                        <a href="/docs">📚 API Documentation</a> | 
+                        <a href="/health">💚 Health Check</a>
+                    </p>
+                </div>
+            </div>
+        </body>
+        </html>"""
+
+FALLBACK_HTML_BYTES = FALLBACK_HTML.encode("utf-8")
+
+def load_index_html() -> bytes:
+    """Read the frontend page once as UTF-8 bytes, falling back to a placeholder when it is missing"""
+    try:
+        with open("app/static/index.html", "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return FALLBACK_HTML_BYTES
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
+    log_listener.start()
     logger.info("Starting Wall Finishing Robot Control System")
+    optimize_task = None
     try:
         await init_db()
+        await warm_up_pool()
         logger.info("Database initialized successfully")
+        app.state.index_html = load_index_html()
+        app.state.openapi_bytes = orjson.dumps(app.openapi())
+        optimize_task = asyncio.create_task(periodic_optimize())
         yield
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
         raise
     finally:
         logger.info("Shutting down Wall Finishing Robot Control System")
+        if optimize_task:
+            optimize_task.cancel()
         try:
             await close_db()
             logger.info("Database connections closed")
         except Exception as e:
             logger.error(f"Error during shutdown: {e}")
+        log_listener.stop()
 
 # Create FastAPI application
 app = FastAPI(
@@ -50,8 +112,11 @@ app = FastAPI(
     version=settings.API_VERSION,
     description="Advanced control system for wall-finishing robots with intelligent path planning and obstacle avoidance",
     lifespan=lifespan,
-    docs_url="/docs" if settings.DEBUG else None,
-    redoc_url="/redoc" if settings.DEBUG else None,
+    default_response_class=ORJSONResponse,
+    # Schema and docs routes are registered below so the schema is served pre-encoded
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
 )
 
 # Add middleware
@@ -59,42 +124,72 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"] if settings.DEBUG else ["http://localhost:8000"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"]
+    allow_methods=["*"] if settings.DEBUG else ["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["*"] if settings.DEBUG else ["Content-Type", "Authorization", "X-Request-ID"],
+    max_age=86400  # let browsers cache preflight responses for a day
 )
-app.add_middleware(GZipMiddleware, minimum_size=1000)
-
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log all requests with timing"""
-    request_id = str(uuid.uuid4())
-    start_time = time.time()
-    request.state.request_id = request_id
+class StreamAwareGZipMiddleware(GZipMiddleware):
+    """GZip that passes event streams through untouched, since gzip buffering stalls them"""
     
-    logger.info(f"Request {request_id}: {request.method} {request.url}")
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and (scope["path"].endswith("/stream") or any(
+                name == b"accept" and b"text/event-stream" in value for name, value in scope["headers"])):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(StreamAwareGZipMiddleware, minimum_size=4096, compresslevel=1)  # fast level; small payloads skip gzip
+
+# Current request id, readable anywhere in the request's task (logging, error helpers)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="unknown")
+
+class RequestLoggingMiddleware:
+    """Log all requests with timing (pure ASGI - no per-request Request/Response wrappers)"""
     
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers.update({
-            "X-Request-ID": request_id,
-            "X-Process-Time": str(process_time)
-        })
-        logger.info(f"Response {request_id}: {response.status_code} ({process_time:.3f}s)")
-        return response
-    except Exception as e:
-        process_time = time.time() - start_time
-        logger.error(f"Request {request_id} failed after {process_time:.3f}s: {str(e)}")
-        raise
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request_id = uuid.uuid4().hex
+        start_time = time.perf_counter()
+        # Not reset on exit: each request runs in its own task context, and the outermost
+        # 500 handler (ServerErrorMiddleware) still needs the id after this middleware unwinds
+        request_id_var.set(request_id)
+        
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - start_time
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode()))
+                headers.append((b"x-process-time", str(process_time).encode()))
+                message["headers"] = headers
+                if logger.isEnabledFor(logging.INFO):
+                    query_string = scope.get("query_string", b"").decode("latin-1")
+                    logger.info("Request %s: %s %s%s -> %s (%.3fs)", request_id, scope["method"], scope["path"],
+                                "?" + query_string if query_string else "", message["status"], process_time)
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_headers)
+        except Exception as e:
+            process_time = time.perf_counter() - start_time
+            logger.error("Request %s failed after %.3fs: %s", request_id, process_time, e)
+            raise
+
+app.add_middleware(RequestLoggingMiddleware)
 
 def create_error_response(request: Request, status_code: int, error: str):
     """Create standardized error response"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content={
             "error": error,
             "status_code": status_code,
-            "request_id": getattr(request.state, "request_id", "unknown"),
+            "request_id": request_id_var.get(),
             "timestamp": time.time()
         }
     )
@@ -102,13 +197,13 @@ def create_error_response(request: Request, status_code: int, error: str):
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Handle HTTP exceptions with proper logging"""
-    logger.error(f"HTTP Exception {getattr(request.state, 'request_id', 'unknown')}: {exc.status_code} - {exc.detail}")
+    logger.error(f"HTTP Exception {request_id_var.get()}: {exc.status_code} - {exc.detail}")
     return create_error_response(request, exc.status_code, exc.detail)
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle general exceptions"""
-    logger.error(f"Unhandled exception {getattr(request.state, 'request_id', 'unknown')}: {str(exc)}", exc_info=True)
+    logger.error(f"Unhandled exception {request_id_var.get()}: {str(exc)}", exc_info=True)
     return create_error_response(request, 500, "Internal server error")
 
 # Include API routes
@@ -116,48 +211,53 @@ app.include_router(walls.router, prefix="/api/v1", tags=["walls"])
 app.include_router(trajectories.router, prefix="/api/v1", tags=["trajectories"])
 app.include_router(planning.router, prefix="/api/v1", tags=["planning"])
 
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers cache assets instead of re-validating every load"""
+    LONG_LIVED_EXTENSIONS = {".css", ".js", ".png", ".jpg", ".svg", ".woff2"}
+    
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        extension = os.path.splitext(path)[1].lower()
+        if response.status_code not in (200, 304):
+            return response
+        if extension in self.LONG_LIVED_EXTENSIONS:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        elif extension == ".html":
+            response.headers["Cache-Control"] = "public, max-age=300"
+        return response
+
 # Create static directory and mount static files
 os.makedirs("app/static", exist_ok=True)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 
 @app.get("/", response_class=HTMLResponse)
-async def read_root():
+async def read_root(request: Request):
     """Serve the main application page"""
-    try:
-        with open("app/static/index.html", "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read())
-    except FileNotFoundError:
-        return HTMLResponse(content="""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Wall Finishing Robot Control System</title>
-            <style>
-                body{font-family:Arial,sans-serif;margin:40px;background:#f5f5f5}
-                .container{background:white;padding:40px;border-radius:10px;max-width:800px;margin:0 auto}
-                h1{color:#2c3e50}
-                .info{background:#e8f4fd;padding:20px;border-radius:5px;margin:20px 0}
-                .error{background:#f8d7da;color:#721c24;padding:20px;border-radius:5px;margin:20px 0}
-                a{color:#3498db;text-decoration:none}
-                a:hover{text-decoration:underline}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>🤖 Wall Finishing Robot Control System</h1>
-                <div class="error">
-                    <strong>Frontend Missing:</strong> Please place <code>index.html</code> in <code>app/static/</code>
-                </div>
-                <div class="info">
-                    <h3>🚀 System Status: Running</h3>
-                    <p>
-                        <a href="/docs">📚 API Documentation</a> | 
-                        <a href="/health">💚 Health Check</a>
-                    </p>
-                </div>
-            </div>
-        </body>
-        </html>""")
+    index_html = getattr(request.app.state, "index_html", None)
+    if index_html is None:  # lifespan not run (e.g. bare TestClient)
+        index_html = request.app.state.index_html = load_index_html()
+    return HTMLResponse(content=index_html)
+
+OPENAPI_URL = "/openapi.json"
+
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def openapi_json(request: Request):
+    """Serve the OpenAPI schema encoded once at startup"""
+    openapi_bytes = getattr(request.app.state, "openapi_bytes", None)
+    if openapi_bytes is None:
+        openapi_bytes = request.app.state.openapi_bytes = orjson.dumps(request.app.openapi())
+    return Response(content=openapi_bytes, media_type="application/json")
+
+if settings.DEBUG:
+    @app.get("/docs", include_in_schema=False)
+    async def swagger_ui():
+        """Interactive API documentation"""
+        return get_swagger_ui_html(openapi_url=OPENAPI_URL, title=f"{settings.API_TITLE} - Swagger UI")
+    
+    @app.get("/redoc", include_in_schema=False)
+    async def redoc():
+        """ReDoc API documentation"""
+        return get_redoc_html(openapi_url=OPENAPI_URL, title=f"{settings.API_TITLE} - ReDoc")
 
 @app.get("/health")
 async def health_check():
@@ -178,5 +278,10 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=settings.DEBUG,
-        log_level=settings.LOG_LEVEL.lower()
+        log_level=settings.LOG_LEVEL.lower() if settings.DEBUG else "warning",
+        # RequestLoggingMiddleware already logs every request with timing
+        access_log=settings.DEBUG,
+        proxy_headers=settings.DEBUG,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
     )
\ No newline at end of file
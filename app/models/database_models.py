@@ -1,21 +1,50 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, Text, ForeignKey, Boolean, Index
-from sqlalchemy.orm import relationship, declarative_mixin
+from sqlalchemy import Column, Integer, Float, String, DateTime, Text, ForeignKey, Boolean, Index, JSON, BINARY
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import relationship, declarative_mixin, reconstructor
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.sql import func
 from app.core.database import Base
+import orjson
 import uuid
 
+class GUID(TypeDecorator):
+    """UUID stored natively on Postgres and as 16-byte BINARY elsewhere"""
+    impl = BINARY(16)
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(PG_UUID(as_uuid=True))
+        return dialect.type_descriptor(BINARY(16))
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value if dialect.name == "postgresql" else value.bytes
+    
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        if isinstance(value, (bytes, memoryview)):
+            return uuid.UUID(bytes=bytes(value))
+        return uuid.UUID(value)  # text UUIDs from before the switch, until run_migrations converts them
+
 # Mixins for common functionality
 @declarative_mixin
 class TimestampMixin:
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True))  # maintained by database triggers (see init_db)
 
 @declarative_mixin
 class UUIDMixin:
-    uuid = Column(String(36), unique=True, index=True, default=lambda: str(uuid.uuid4()))
+    uuid = Column(GUID(), unique=True, index=True, default=uuid.uuid4)
 
 class BaseModel(Base):
     __abstract__ = True
+    __mapper_args__ = {"eager_defaults": True}  # fetch server defaults via INSERT ... RETURNING
     id = Column(Integer, primary_key=True, index=True)
 
 class Wall(BaseModel, TimestampMixin, UUIDMixin):
@@ -45,7 +74,7 @@ class Obstacle(BaseModel):
     min_y = Column(Float, nullable=False)
     max_x = Column(Float, nullable=False)
     max_y = Column(Float, nullable=False)
-    geometry_data = Column(Text, nullable=False)
+    geometry_data = Column(JSON, nullable=False)  # TEXT on SQLite; parsed once at row load
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     wall = relationship("Wall", back_populates="obstacles")
@@ -55,6 +84,13 @@ class Obstacle(BaseModel):
         Index('idx_obstacle_wall', 'wall_id'),
         Index('idx_obstacle_type', 'obstacle_type'),
     )
+    
+    @reconstructor
+    def _decode_legacy_geometry(self):
+        """Decode geometry rows stored as a JSON string once, when the instance is loaded"""
+        geometry_data = self.__dict__.get("geometry_data")
+        if isinstance(geometry_data, str):
+            set_committed_value(self, "geometry_data", orjson.loads(geometry_data))
 
 class Trajectory(BaseModel, TimestampMixin, UUIDMixin):
     __tablename__ = "trajectories"
@@ -101,11 +137,15 @@ class TrajectoryPoint(BaseModel):
     trajectory = relationship("Trajectory", back_populates="points")
     
     __table_args__ = (
-        Index('idx_trajectory_point_spatial', 'x', 'y'),
-        Index('idx_trajectory_point_sequence', 'trajectory_id', 'sequence_number'),
+        # Covering index for ordered point fetches (index-only scans on SQLite, INCLUDE on Postgres)
+        Index('idx_tp_seq_cov', 'trajectory_id', 'sequence_number', 'x', 'y', 'z', 'tool_active',
+              postgresql_include=['orientation', 'feed_rate', 'motion_type', 'planned_time']),
         Index('idx_trajectory_point_time', 'planned_time'),
     )
 
+# Core table for bulk point inserts that skip the ORM unit of work
+trajectory_point_table = TrajectoryPoint.__table__
+
 class SystemLog(BaseModel):
     __tablename__ = "system_logs"
     
@@ -113,8 +153,8 @@ class SystemLog(BaseModel):
     level = Column(String(10), nullable=False)
     component = Column(String(50))
     message = Column(Text, nullable=False)
-    request_id = Column(String(36))
-    user_id = Column(String(36))
+    request_id = Column(String(36))  # request ids are not always UUIDs (e.g. "unknown" outside a request)
+    user_id = Column(GUID())
     endpoint = Column(String(100))
     execution_time_ms = Column(Integer)
     memory_usage_mb = Column(Float)
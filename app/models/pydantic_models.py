@@ -1,9 +1,11 @@
 # app/models/pydantic_models.py
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, field_validator, model_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from uuid import UUID
 from enum import Enum
+import orjson
 
 # Enums
 class ObstacleType(str, Enum):
@@ -84,10 +86,16 @@ class ObstacleResponse(BaseResponse):
     max_x: float
     max_y: float
     created_at: datetime
+    
+    @field_validator("geometry_data", mode="before")
+    @classmethod
+    def parse_geometry_data(cls, value):
+        """Accept geometry stored as a JSON string (legacy TEXT rows)"""
+        return orjson.loads(value) if isinstance(value, (str, bytes)) else value
 
 class WallResponse(TimestampedResponse):
     id: int
-    uuid: str
+    uuid: UUID
     name: str
     width: float
     height: float
@@ -108,7 +116,7 @@ class TrajectoryPointResponse(BaseResponse):
 
 class TrajectoryResponse(TimestampedResponse):
     id: int
-    uuid: str
+    uuid: UUID
     wall_id: int
     name: Optional[str]
     algorithm: str
@@ -122,6 +130,14 @@ class TrajectoryResponse(TimestampedResponse):
     execution_time_ms: int
     estimated_duration_minutes: float
     points: List[TrajectoryPointResponse] = []
+    
+    @model_validator(mode="before")
+    @classmethod
+    def skip_unloaded_points(cls, data):
+        """Treat an unloaded ORM points collection as empty instead of touching it"""
+        if isinstance(data, dict) or "points" in getattr(data, "__dict__", {"points": None}):
+            return data
+        return {field: getattr(data, field) for field in cls.model_fields if field != "points"}
 
 class PlanningResult(BaseModel):
     trajectory_id: int
@@ -158,4 +174,11 @@ class ErrorResponse(BaseModel):
 class SuccessResponse(BaseModel):
     message: str
     status_code: int = 200
-    timestamp: float
\ No newline at end of file
+    timestamp: float
+
+# Shared adapters - serializers compiled once and reused by the routers
+WALL_RESPONSE_ADAPTER = TypeAdapter(WallResponse)
+WALL_LIST_ADAPTER = TypeAdapter(List[WallResponse])
+OBSTACLE_LIST_ADAPTER = TypeAdapter(List[ObstacleResponse])
+TRAJECTORY_RESPONSE_ADAPTER = TypeAdapter(TrajectoryResponse)
+TRAJECTORY_LIST_ADAPTER = TypeAdapter(List[TrajectoryResponse])
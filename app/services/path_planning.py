@@ -1,26 +1,56 @@
+import asyncio
 import numpy as np
 import logging
-import json
 import time
 import math
 from typing import List, Tuple, Dict, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
-from app.models.database_models import Wall, Obstacle, Trajectory, TrajectoryPoint
+from app.config import settings
+from app.models.database_models import Wall, Obstacle, Trajectory, trajectory_point_table
 from app.models.pydantic_models import TrajectoryPlanRequest, PlanningResult
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
+MOTION_TYPES = ("linear", "rapid")
+LINEAR, RAPID = range(len(MOTION_TYPES))
+
 @dataclass
-class PathPoint:
-    x: float
-    y: float
-    z: float = 0.0
-    orientation: float = 0.0
-    tool_active: bool = True
-    motion_type: str = "linear"
-    feed_rate: float = 100.0
+class PathArray:
+    """Planned path stored column-wise, one NumPy array per point attribute"""
+    xs: np.ndarray
+    ys: np.ndarray
+    zs: np.ndarray
+    orientations: np.ndarray
+    tool_active: np.ndarray
+    motion_types: np.ndarray  # indices into MOTION_TYPES
+    feed_rates: np.ndarray
+    
+    @classmethod
+    def from_xy(cls, xs: np.ndarray, ys: np.ndarray, orientations: np.ndarray) -> "PathArray":
+        """Build a cutting path with default z, tool state, motion type and feed rate"""
+        n = len(xs)
+        return cls(
+            xs=np.asarray(xs, dtype=float), ys=np.asarray(ys, dtype=float), zs=np.zeros(n),
+            orientations=np.asarray(orientations, dtype=float), tool_active=np.ones(n, dtype=bool),
+            motion_types=np.full(n, LINEAR, dtype=np.int8), feed_rates=np.full(n, 100.0)
+        )
+    
+    def __len__(self) -> int:
+        return len(self.xs)
+    
+    def take(self, indices: np.ndarray) -> "PathArray":
+        """Return a new path made of the points at the given indices"""
+        return PathArray(
+            xs=self.xs[indices], ys=self.ys[indices], zs=self.zs[indices],
+            orientations=self.orientations[indices], tool_active=self.tool_active[indices],
+            motion_types=self.motion_types[indices], feed_rates=self.feed_rates[indices]
+        )
 
 @dataclass
 class PlanningParameters:
@@ -30,15 +60,32 @@ class PlanningParameters:
     wall_width: float
     wall_height: float
     obstacles: List[Dict[str, Any]]
+    effective_area: float = 0.0  # wall area minus rectangle obstacle area
+    # Rectangle obstacle bounds inflated by half the robot width, one entry per obstacle
+    obs_min_x: np.ndarray = field(default_factory=lambda: np.empty(0))
+    obs_max_x: np.ndarray = field(default_factory=lambda: np.empty(0))
+    obs_min_y: np.ndarray = field(default_factory=lambda: np.empty(0))
+    obs_max_y: np.ndarray = field(default_factory=lambda: np.empty(0))
+    # Coarse bitmap of cells touched by any inflated obstacle; unmarked cells are always free
+    occupancy: np.ndarray = field(default_factory=lambda: np.zeros((1, 1), dtype=bool))
+    cell_size: float = 1.0
 
 class PathPlanningService:
     RAPID_THRESHOLD = 0.05  # 5cm
     AVG_FEED_RATE = 0.1  # m/min
     COLLINEAR_TOLERANCE = 0.001
-    BATCH_SIZE = 1000
+    COORDINATE_SCALE = 1_000_000  # metres to micrometres for integer collinearity tests
+    OCCUPANCY_MAX_CELLS = 1_000_000
+    INSERT_CHUNK_SIZE = 10_000
     
     def __init__(self):
-        pass
+        self._algorithms = {
+            "boustrophedon": self._plan_boustrophedon,
+            "spiral": self._plan_spiral,
+            "zigzag": self._plan_zigzag
+        }
+        self._plan_cache: "OrderedDict[Tuple, Tuple[PathArray, Dict[str, float]]]" = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=settings.PLANNING_WORKERS, thread_name_prefix="planner")
     
     async def plan_trajectory(self, db: AsyncSession, wall: Wall, request: TrajectoryPlanRequest) -> PlanningResult:
         """Main entry point for trajectory planning"""
@@ -49,20 +96,18 @@ class PathPlanningService:
             logger.info(f"Starting trajectory planning for wall {wall.id} with {algorithm} algorithm")
             
             params = self._prepare_planning_parameters(wall, request)
-            path_points = self._execute_algorithm(algorithm, params)
-            optimized_points = self._optimize_path(path_points, params)
-            metrics = self._calculate_path_metrics(optimized_points, params)
+            path, metrics = await self._plan_path(algorithm, params)
             
-            trajectory = await self._create_trajectory_record(db, wall, request, optimized_points, metrics, start_time)
+            trajectory = await self._create_trajectory_record(db, wall, request, path, metrics, start_time)
             execution_time = int((time.time() - start_time) * 1000)
             
-            logger.info(f"Trajectory planning completed: {len(optimized_points)} points, {metrics['total_length']:.2f}m path")
+            logger.info(f"Trajectory planning completed: {len(path)} points, {metrics['total_length']:.2f}m path")
             
             return PlanningResult(
                 trajectory_id=trajectory.id,
                 wall_id=wall.id,
                 algorithm=algorithm,
-                total_points=len(optimized_points),
+                total_points=len(path),
                 total_length=metrics['total_length'],
                 coverage_percentage=metrics['coverage_percentage'],
                 execution_time_ms=execution_time,
@@ -83,217 +128,273 @@ class PathPlanningService:
         """Prepare parameters for path planning"""
         obstacles_data = []
         for obstacle in wall.obstacles:
-            geometry_data = json.loads(obstacle.geometry_data) if isinstance(obstacle.geometry_data, str) else obstacle.geometry_data
             obstacles_data.append({
                 'type': obstacle.obstacle_type,
-                'geometry': geometry_data,
+                'geometry': obstacle.geometry_data,
                 'bounds': {'min_x': obstacle.min_x, 'min_y': obstacle.min_y, 'max_x': obstacle.max_x, 'max_y': obstacle.max_y}
             })
         
         logger.info(f"Planning for wall {wall.width}x{wall.height}m with {len(obstacles_data)} obstacles")
         
-        return PlanningParameters(
+        buffer = request.robot_width / 2
+        rects = np.array([
+            (obs['geometry']['center_x'], obs['geometry']['center_y'], obs['geometry']['width'], obs['geometry']['height'])
+            for obs in obstacles_data if obs['type'] == 'rectangle'
+        ], dtype=float).reshape(-1, 4)
+        half_w, half_h = rects[:, 2] / 2, rects[:, 3] / 2
+        
+        params = PlanningParameters(
             robot_width=request.robot_width,
             overlap_percentage=request.overlap_percentage,
             resolution=request.resolution,
             wall_width=wall.width,
             wall_height=wall.height,
-            obstacles=obstacles_data
+            obstacles=obstacles_data,
+            effective_area=wall.width * wall.height - float((rects[:, 2] * rects[:, 3]).sum()),
+            obs_min_x=rects[:, 0] - half_w - buffer,
+            obs_max_x=rects[:, 0] + half_w + buffer,
+            obs_min_y=rects[:, 1] - half_h - buffer,
+            obs_max_y=rects[:, 1] + half_h + buffer
         )
+        self._build_occupancy_grid(params)
+        return params
+    
+    def _build_occupancy_grid(self, params: PlanningParameters):
+        """Rasterize the inflated obstacle bounds onto a grid of at most OCCUPANCY_MAX_CELLS cells"""
+        params.cell_size = max(params.resolution,
+                               math.sqrt(params.wall_width * params.wall_height / self.OCCUPANCY_MAX_CELLS))
+        rows = int(params.wall_height / params.cell_size) + 1
+        cols = int(params.wall_width / params.cell_size) + 1
+        params.occupancy = np.zeros((rows, cols), dtype=bool)
+        
+        # Cell ranges are clipped exactly like query points, so every point inside an
+        # obstacle lands on a marked cell
+        ix0, ix1 = self._cell_index(params.obs_min_x, cols, params), self._cell_index(params.obs_max_x, cols, params)
+        iy0, iy1 = self._cell_index(params.obs_min_y, rows, params), self._cell_index(params.obs_max_y, rows, params)
+        for x0, x1, y0, y1 in zip(ix0.tolist(), ix1.tolist(), iy0.tolist(), iy1.tolist()):
+            params.occupancy[y0:y1 + 1, x0:x1 + 1] = True
+    
+    def _cell_index(self, values: np.ndarray, size: int, params: PlanningParameters) -> np.ndarray:
+        """Map coordinates to occupancy grid indices, clamped to the grid"""
+        return np.clip(np.floor(values / params.cell_size), 0, size - 1).astype(int)
     
-    def _execute_algorithm(self, algorithm: str, params: PlanningParameters) -> List[PathPoint]:
+    async def _plan_path(self, algorithm: str, params: PlanningParameters) -> Tuple[PathArray, Dict[str, float]]:
+        """Plan, optimize and measure a path, reusing the result of an identical earlier request"""
+        key = self._plan_cache_key(algorithm, params)
+        cached = self._plan_cache.get(key)
+        if cached is not None:
+            self._plan_cache.move_to_end(key)
+            logger.info(f"Reusing cached {algorithm} plan")
+            return cached
+        
+        # Planning is CPU-bound; run it off the event loop so other requests keep being served
+        loop = asyncio.get_running_loop()
+        path, metrics = await loop.run_in_executor(self._executor, self._compute_plan, algorithm, params)
+        
+        if settings.PLANNING_CACHE_SIZE > 0:
+            # Cached arrays are shared between requests, so freeze them
+            for column in vars(path).values():
+                column.flags.writeable = False
+            self._plan_cache[key] = (path, metrics)
+            if len(self._plan_cache) > settings.PLANNING_CACHE_SIZE:
+                self._plan_cache.popitem(last=False)
+        return path, metrics
+    
+    def _compute_plan(self, algorithm: str, params: PlanningParameters) -> Tuple[PathArray, Dict[str, float]]:
+        """Run the planner, path optimization and metrics synchronously"""
+        return self._optimize_path(self._execute_algorithm(algorithm, params), params)
+    
+    def _plan_cache_key(self, algorithm: str, params: PlanningParameters) -> Tuple:
+        """Key a plan by everything the planners read: wall size, request parameters and obstacle bounds"""
+        obstacle_bounds = tuple(sorted(zip(params.obs_min_x.tolist(), params.obs_max_x.tolist(),
+                                           params.obs_min_y.tolist(), params.obs_max_y.tolist())))
+        return (algorithm, params.wall_width, params.wall_height, params.robot_width,
+                params.overlap_percentage, params.resolution, obstacle_bounds)
+    
+    def _execute_algorithm(self, algorithm: str, params: PlanningParameters) -> PathArray:
         """Execute the specified planning algorithm"""
-        algorithms = {
-            "boustrophedon": self._plan_boustrophedon,
-            "spiral": self._plan_spiral,
-            "zigzag": self._plan_zigzag
-        }
-        
-        if algorithm not in algorithms:
+        if algorithm not in self._algorithms:
             raise ValueError(f"Unknown algorithm: {algorithm}")
         
-        return algorithms[algorithm](params)
+        return self._algorithms[algorithm](params)
     
-    def _plan_boustrophedon(self, params: PlanningParameters) -> List[PathPoint]:
+    def _plan_boustrophedon(self, params: PlanningParameters) -> PathArray:
         """Implement boustrophedon (back-and-forth) coverage pattern"""
         logger.info("Planning boustrophedon trajectory")
         
-        path_points = []
+        half_width = params.robot_width / 2
         effective_width = params.robot_width * (1 - params.overlap_percentage / 100)
-        y_positions = np.arange(params.robot_width/2, params.wall_height - params.robot_width/2, effective_width)
+        y_positions = np.arange(half_width, params.wall_height - half_width, effective_width)
         
-        direction = 1
-        for y in y_positions:
-            x_start = params.robot_width/2 if direction == 1 else params.wall_width - params.robot_width/2
-            x_end = params.wall_width - params.robot_width/2 if direction == 1 else params.robot_width/2
-            x_positions = np.arange(x_start, x_end, params.resolution * direction)
-            
-            for x in x_positions:
-                if self._is_point_free(x, y, params):
-                    path_points.append(PathPoint(
-                        x=float(x), y=float(y),
-                        orientation=0 if direction == 1 else math.pi
-                    ))
-            
-            direction *= -1
+        # One forward sweep is computed once; odd rows reuse it reversed, so every
+        # row visits the same x lattice and no negative-step arange is needed
+        forward = np.arange(half_width, params.wall_width - half_width, params.resolution)
+        grid = np.empty((len(y_positions), len(forward)))
+        grid[0::2] = forward
+        grid[1::2] = forward[::-1]
         
-        logger.info(f"Generated {len(path_points)} points for boustrophedon trajectory")
-        return path_points
+        xs = grid.ravel()
+        ys = np.repeat(y_positions, len(forward))
+        orientations = np.repeat(np.where(np.arange(len(y_positions)) % 2, math.pi, 0.0), len(forward))
+        
+        free = self._free_mask(xs, ys, params)
+        path = PathArray.from_xy(xs[free], ys[free], orientations[free])
+        
+        logger.info(f"Generated {len(path)} points for boustrophedon trajectory")
+        return path
     
-    def _plan_spiral(self, params: PlanningParameters) -> List[PathPoint]:
+    def _plan_spiral(self, params: PlanningParameters) -> PathArray:
         """Implement spiral coverage pattern"""
         logger.info("Planning spiral trajectory")
         
-        path_points = []
         center_x, center_y = params.wall_width / 2, params.wall_height / 2
         max_radius = min(params.wall_width, params.wall_height) / 2 - params.robot_width / 2
         effective_width = params.robot_width * (1 - params.overlap_percentage / 100)
         
-        radius, angle = params.robot_width / 2, 0
-        
-        while radius < max_radius:
-            angle_step = params.resolution / max(radius, 0.01)
-            x = center_x + radius * math.cos(angle)
-            y = center_y + radius * math.sin(angle)
-            
-            if self._is_within_bounds(x, y, params) and self._is_point_free(x, y, params):
-                path_points.append(PathPoint(x=x, y=y, orientation=angle + math.pi/2))
-            
-            angle += angle_step
-            if angle >= 2 * math.pi:
-                angle = 0
-                radius += effective_width
-        
-        logger.info(f"Generated {len(path_points)} points for spiral trajectory")
-        return path_points
+        # Radii and per-ring angles are accumulated with add.accumulate so they match
+        # the repeated += of a stepwise walk bit for bit
+        ring_count = max(0, math.ceil((max_radius - params.robot_width / 2) / effective_width)) + 1
+        radii = np.add.accumulate(np.r_[params.robot_width / 2, np.full(ring_count, effective_width)])
+        radii = radii[radii < max_radius]
+        
+        # Each ring holds at most ceil(2π / step) + 2 angles, so one buffer sized to the sum
+        # of those bounds is filled in place and trimmed to the angles actually kept
+        angle_steps = params.resolution / np.maximum(radii, 0.01)
+        capacities = np.ceil(2 * np.pi / angle_steps).astype(int) + 2
+        theta = np.empty(int(capacities.sum()))
+        r = np.empty_like(theta)
+        count = 0
+        for radius, angle_step, capacity in zip(radii.tolist(), angle_steps.tolist(), capacities.tolist()):
+            angles = theta[count:count + capacity]
+            angles[0], angles[1:] = 0.0, angle_step
+            np.add.accumulate(angles, out=angles)
+            ring_size = int(np.searchsorted(angles, 2 * math.pi))
+            r[count:count + ring_size] = radius
+            count += ring_size
+        theta, r = theta[:count], r[:count]
+        xs = center_x + r * np.cos(theta)
+        ys = center_y + r * np.sin(theta)
+        
+        keep = self._is_within_bounds(xs, ys, params) & self._free_mask(xs, ys, params)
+        path = PathArray.from_xy(xs[keep], ys[keep], theta[keep] + math.pi / 2)
+        
+        logger.info(f"Generated {len(path)} points for spiral trajectory")
+        return path
     
-    def _plan_zigzag(self, params: PlanningParameters) -> List[PathPoint]:
+    def _plan_zigzag(self, params: PlanningParameters) -> PathArray:
         """Implement zigzag coverage pattern"""
         logger.info("Planning zigzag trajectory")
         
-        path_points = []
         diagonal_angle = math.pi / 4
+        half_width = params.robot_width / 2
         effective_width = params.robot_width * (1 - params.overlap_percentage / 100)
         spacing = effective_width / math.sin(diagonal_angle)
         num_passes = int(params.wall_width / spacing) + 1
         
-        for i in range(num_passes):
-            x_offset = i * spacing
-            
-            if i % 2 == 0:  # Bottom-left to top-right
-                start_x, start_y = x_offset, params.robot_width / 2
-                end_x = min(params.wall_width - params.robot_width/2, x_offset + params.wall_height)
-                end_y = min(params.wall_height - params.robot_width/2, start_y + (end_x - start_x))
-                orientation = diagonal_angle
-            else:  # Top-left to bottom-right
-                start_x, start_y = x_offset, params.wall_height - params.robot_width/2
-                end_x = min(params.wall_width - params.robot_width/2, x_offset + params.wall_height)
-                end_y = max(params.robot_width/2, start_y - (end_x - start_x))
-                orientation = -diagonal_angle
-            
-            distance = self._calculate_distance(start_x, start_y, end_x, end_y)
-            num_points = max(2, int(distance / params.resolution))
-            
-            for j in range(num_points):
-                t = j / max(num_points - 1, 1)
-                x = start_x + t * (end_x - start_x)
-                y = start_y + t * (end_y - start_y)
-                
-                if self._is_point_free(x, y, params):
-                    path_points.append(PathPoint(x=x, y=y, orientation=orientation))
-        
-        logger.info(f"Generated {len(path_points)} points for zigzag trajectory")
-        return path_points
+        # Even passes run bottom-left to top-right, odd passes top-left to bottom-right
+        x_offset = np.arange(num_passes) * spacing
+        upward = np.arange(num_passes) % 2 == 0
+        start_x = x_offset
+        start_y = np.where(upward, half_width, params.wall_height - half_width)
+        end_x = np.minimum(params.wall_width - half_width, x_offset + params.wall_height)
+        end_y = np.where(upward,
+                         np.minimum(params.wall_height - half_width, start_y + (end_x - start_x)),
+                         np.maximum(half_width, start_y - (end_x - start_x)))
+        orientation = np.where(upward, diagonal_angle, -diagonal_angle)
+        
+        distance = np.sqrt((end_x - start_x)**2 + (end_y - start_y)**2)
+        num_points = np.maximum(2, (distance / params.resolution).astype(int))
+        
+        # Sample every pass parametrically in one shot: t runs 0..1 within each pass
+        pass_idx = np.repeat(np.arange(num_passes), num_points)
+        step = np.arange(len(pass_idx)) - np.repeat(np.cumsum(num_points) - num_points, num_points)
+        t = step / np.maximum(num_points - 1, 1)[pass_idx]
+        xs = start_x[pass_idx] + t * (end_x - start_x)[pass_idx]
+        ys = start_y[pass_idx] + t * (end_y - start_y)[pass_idx]
+        
+        free = self._free_mask(xs, ys, params)
+        path = PathArray.from_xy(xs[free], ys[free], orientation[pass_idx][free])
+        
+        logger.info(f"Generated {len(path)} points for zigzag trajectory")
+        return path
     
-    def _is_within_bounds(self, x: float, y: float, params: PlanningParameters) -> bool:
-        """Check if point is within wall bounds"""
-        return (params.robot_width/2 <= x <= params.wall_width - params.robot_width/2 and 
-                params.robot_width/2 <= y <= params.wall_height - params.robot_width/2)
+    def _is_within_bounds(self, x, y, params: PlanningParameters):
+        """Check if point (or arrays of points) is within wall bounds"""
+        return ((params.robot_width/2 <= x) & (x <= params.wall_width - params.robot_width/2) &
+                (params.robot_width/2 <= y) & (y <= params.wall_height - params.robot_width/2))
     
-    def _is_point_free(self, x: float, y: float, params: PlanningParameters) -> bool:
-        """Check if a point is free from obstacles"""
-        buffer = params.robot_width / 2
-        for obstacle in params.obstacles:
-            if obstacle['type'] == 'rectangle':
-                geom = obstacle['geometry']
-                if (geom['center_x'] - geom['width']/2 - buffer <= x <= geom['center_x'] + geom['width']/2 + buffer and
-                    geom['center_y'] - geom['height']/2 - buffer <= y <= geom['center_y'] + geom['height']/2 + buffer):
-                    return False
-        return True
+    def _free_mask(self, xs: np.ndarray, ys: np.ndarray, params: PlanningParameters) -> np.ndarray:
+        """Boolean mask of candidate points that lie outside every inflated obstacle"""
+        free = np.ones(xs.shape, dtype=bool)
+        if params.obs_min_x.size == 0:
+            return free
+        
+        rows, cols = params.occupancy.shape
+        near = np.flatnonzero(params.occupancy[self._cell_index(ys, rows, params), self._cell_index(xs, cols, params)])
+        
+        # Only points on marked cells need the exact test against every obstacle
+        # Each bound is compared into one scratch buffer and and-ed in, so only two (n, m) arrays are allocated
+        near_xs, near_ys = xs[near, None], ys[near, None]
+        blocked = np.greater_equal(near_xs, params.obs_min_x)
+        scratch = np.empty_like(blocked)
+        blocked &= np.less_equal(near_xs, params.obs_max_x, out=scratch)
+        blocked &= np.greater_equal(near_ys, params.obs_min_y, out=scratch)
+        blocked &= np.less_equal(near_ys, params.obs_max_y, out=scratch)
+        free[near] = ~blocked.any(axis=1)
+        return free
     
-    def _calculate_distance(self, x1: float, y1: float, x2: float, y2: float, z1: float = 0, z2: float = 0) -> float:
-        """Calculate distance between two points"""
-        return math.sqrt((x2 - x1)**2 + (y2 - y1)**2 + (z2 - z1)**2)
+    def _optimize_path(self, path: PathArray, params: PlanningParameters) -> Tuple[PathArray, Dict[str, float]]:
+        """Optimize path for efficiency and return it with its metrics"""
+        if len(path) > 2:
+            # Remove collinear points; each interior point is judged against its original neighbours
+            keep = np.ones(len(path), dtype=bool)
+            keep[1:-1] = ~self._collinear_mask(path.xs, path.ys)
+            path = path.take(np.flatnonzero(keep))
+        
+        return self._add_connecting_moves(path, params)
     
-    def _optimize_path(self, path_points: List[PathPoint], params: PlanningParameters) -> List[PathPoint]:
-        """Optimize path for efficiency"""
-        if len(path_points) < 2:
-            return path_points
-        
-        # Remove collinear points
-        optimized = [path_points[0]]
-        for i in range(1, len(path_points) - 1):
-            if not self._is_collinear(path_points[i-1], path_points[i], path_points[i+1]):
-                optimized.append(path_points[i])
-        
-        if len(path_points) > 1:
-            optimized.append(path_points[-1])
-        
-        return self._add_connecting_moves(optimized)
-    
-    def _is_collinear(self, p1: PathPoint, p2: PathPoint, p3: PathPoint) -> bool:
-        """Check if three points are collinear"""
-        cross_product = abs((p2.x - p1.x) * (p3.y - p1.y) - (p2.y - p1.y) * (p3.x - p1.x))
-        return cross_product < self.COLLINEAR_TOLERANCE
+    def _collinear_mask(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Flag each interior point that is collinear with its two neighbours"""
+        # Exact int64 arithmetic on micrometre coordinates, so near-cancelling cross
+        # products are not distorted by floating point rounding
+        xs = np.rint(xs * self.COORDINATE_SCALE).astype(np.int64)
+        ys = np.rint(ys * self.COORDINATE_SCALE).astype(np.int64)
+        cross = np.subtract(xs[1:-1], xs[:-2])
+        cross *= ys[2:] - ys[:-2]
+        other = np.subtract(ys[1:-1], ys[:-2])
+        other *= xs[2:] - xs[:-2]
+        cross -= other
+        return np.abs(cross, out=cross) < self.COLLINEAR_TOLERANCE * self.COORDINATE_SCALE**2
     
-    def _add_connecting_moves(self, path_points: List[PathPoint]) -> List[PathPoint]:
-        """Add connecting moves between path segments"""
-        if len(path_points) < 2:
-            return path_points
-        
-        optimized_points = [path_points[0]]
-        
-        for i in range(1, len(path_points)):
-            prev_point = path_points[i-1]
-            current_point = path_points[i]
-            
-            distance = self._calculate_distance(prev_point.x, prev_point.y, current_point.x, current_point.y)
-            
-            if distance > self.RAPID_THRESHOLD:
-                optimized_points.append(PathPoint(
-                    x=current_point.x, y=current_point.y, z=0.0,
-                    tool_active=False, motion_type="rapid"
-                ))
-            
-            optimized_points.append(current_point)
-        
-        return optimized_points
+    def _add_connecting_moves(self, path: PathArray, params: PlanningParameters) -> Tuple[PathArray, Dict[str, float]]:
+        """Add connecting moves between path segments, measuring the path from the same segment lengths"""
+        segment_lengths = np.sqrt(np.diff(path.xs)**2 + np.diff(path.ys)**2)
+        needs_rapid = segment_lengths > self.RAPID_THRESHOLD
+        jumps = np.flatnonzero(needs_rapid) + 1
+        
+        # Planned paths are flat, so a rapid move covers the whole gap it bridges and the
+        # zero-length step onto the next point adds nothing; only direct moves can cut
+        total_length = float(segment_lengths.sum())
+        cutting_length = float(segment_lengths[~needs_rapid & path.tool_active[1:]].sum())
+        
+        # A rapid move to the next point's position is inserted ahead of every jump
+        connected = PathArray(
+            xs=np.insert(path.xs, jumps, path.xs[jumps]),
+            ys=np.insert(path.ys, jumps, path.ys[jumps]),
+            zs=np.insert(path.zs, jumps, 0.0),
+            orientations=np.insert(path.orientations, jumps, 0.0),
+            tool_active=np.insert(path.tool_active, jumps, False),
+            motion_types=np.insert(path.motion_types, jumps, RAPID),
+            feed_rates=np.insert(path.feed_rates, jumps, 100.0)
+        )
+        return connected, self._calculate_path_metrics(total_length, cutting_length, params)
     
-    def _calculate_path_metrics(self, path_points: List[PathPoint], params: PlanningParameters) -> Dict[str, float]:
+    def _calculate_path_metrics(self, total_length: float, cutting_length: float, params: PlanningParameters) -> Dict[str, float]:
         """Calculate path performance metrics"""
-        if not path_points:
-            return {'total_length': 0.0, 'coverage_percentage': 0.0, 'estimated_duration': 0.0}
-        
-        total_length = cutting_length = 0.0
-        
-        for i in range(1, len(path_points)):
-            segment_length = self._calculate_distance(
-                path_points[i-1].x, path_points[i-1].y,
-                path_points[i].x, path_points[i].y,
-                path_points[i-1].z, path_points[i].z
-            )
-            total_length += segment_length
-            if path_points[i].tool_active:
-                cutting_length += segment_length
-        
         # Calculate coverage
-        wall_area = params.wall_width * params.wall_height
-        obstacle_area = sum(obs['geometry']['width'] * obs['geometry']['height'] 
-                          for obs in params.obstacles if obs['type'] == 'rectangle')
-        
-        effective_area = wall_area - obstacle_area
         covered_area = cutting_length * params.robot_width
-        coverage_percentage = min(100.0, (covered_area / effective_area) * 100) if effective_area > 0 else 0.0
+        coverage_percentage = (min(100.0, (covered_area / params.effective_area) * 100)
+                               if params.effective_area > 0 else 0.0)
         
         estimated_duration = cutting_length / self.AVG_FEED_RATE if self.AVG_FEED_RATE > 0 else 0.0
         
@@ -304,7 +405,7 @@ class PathPlanningService:
         }
     
     async def _create_trajectory_record(self, db: AsyncSession, wall: Wall, request: TrajectoryPlanRequest,
-                                      path_points: List[PathPoint], metrics: Dict[str, float], start_time: float) -> Trajectory:
+                                      path: PathArray, metrics: Dict[str, float], start_time: float) -> Trajectory:
         """Create trajectory record in database"""
         execution_time_ms = int((time.time() - start_time) * 1000)
         algorithm = self._get_algorithm_name(request.algorithm)
@@ -326,28 +427,21 @@ class PathPlanningService:
         db.add(trajectory)
         await db.flush()
         
-        # Create trajectory points in batches
-        trajectory_points = []
-        for i, point in enumerate(path_points):
-            trajectory_points.append(TrajectoryPoint(
-                trajectory_id=trajectory.id,
-                sequence_number=i,
-                x=point.x, y=point.y, z=point.z,
-                orientation=point.orientation,
-                tool_active=point.tool_active,
-                motion_type=point.motion_type,
-                feed_rate=point.feed_rate,
-                planned_time=i * 0.1
-            ))
-            
-            if len(trajectory_points) >= self.BATCH_SIZE:
-                db.add_all(trajectory_points)
-                await db.flush()
-                trajectory_points = []
-        
-        if trajectory_points:
-            db.add_all(trajectory_points)
+        # Insert points through Core executemany in bounded chunks, bypassing the ORM unit of work
+        rows = enumerate(zip(path.xs.tolist(), path.ys.tolist(), path.zs.tolist(), path.orientations.tolist(),
+                             path.tool_active.tolist(), path.motion_types.tolist(), path.feed_rates.tolist()))
+        while chunk := [
+            {
+                "trajectory_id": trajectory.id, "sequence_number": i,
+                "x": x, "y": y, "z": z,
+                "orientation": orientation, "tool_active": tool_active,
+                "motion_type": MOTION_TYPES[motion_type], "feed_rate": feed_rate,
+                "planned_time": i * 0.1
+            }
+            for i, (x, y, z, orientation, tool_active, motion_type, feed_rate) in islice(rows, self.INSERT_CHUNK_SIZE)
+        ]:
+            await db.execute(insert(trajectory_point_table), chunk)
         
         await db.commit()
-        logger.info(f"Created trajectory {trajectory.id} with {len(path_points)} points")
+        logger.info(f"Created trajectory {trajectory.id} with {len(path)} points")
         return trajectory
\ No newline at end of file
@@ -2,9 +2,12 @@
 import pytest
 import asyncio
 import time
+import uuid
 from fastapi.testclient import TestClient
 from app.main import app
-from app.core.database import get_db, init_db
+from app.core import database
+from app.core.cache import ResponseCache
+from app.core.database import Base, get_db, init_db
 
 client = TestClient(app)
 
@@ -13,6 +16,26 @@ def setup_test_db():
     """Setup test database before running tests"""
     asyncio.run(init_db())
 
+def create_test_wall(name):
+    """Create a 5m x 3m wall and return its id"""
+    response = client.post("/api/v1/walls", json={
+        "name": name,
+        "width": 5.0,
+        "height": 3.0
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+@pytest.fixture(scope="session")
+def shared_wall():
+    """Create one wall shared by tests that only read it; tests must not add obstacles to it"""
+    return create_test_wall("Shared Test Wall")
+
+@pytest.fixture
+def obstacle_wall():
+    """Create a fresh wall for tests that add obstacles"""
+    return create_test_wall("Obstacle Test Wall")
+
 class TestWallsAPI:
     """Test wall CRUD operations"""
     
@@ -37,8 +60,6 @@ class TestWallsAPI:
         assert data["name"] == "Test Wall"
         assert data["width"] == 5.0
         assert data["height"] == 3.0
-        
-        return data["id"]  # Return wall ID for other tests
     
     def test_get_walls(self):
         """Test retrieving walls"""
@@ -51,10 +72,9 @@ class TestWallsAPI:
         assert response_time < 1.0
         assert isinstance(response.json(), list)
     
-    def test_get_wall_by_id(self):
+    def test_get_wall_by_id(self, shared_wall):
         """Test retrieving specific wall"""
-        # First create a wall
-        wall_id = self.test_create_wall()
+        wall_id = shared_wall
         
         start_time = time.time()
         response = client.get(f"/api/v1/walls/{wall_id}")
@@ -66,6 +86,27 @@ class TestWallsAPI:
         data = response.json()
         assert data["id"] == wall_id
     
+    def test_get_wall_after_update(self):
+        """Test a cached wall is invalidated by an update"""
+        wall_id = create_test_wall("Cached Test Wall")
+        assert client.get(f"/api/v1/walls/{wall_id}").json()["name"] == "Cached Test Wall"
+        
+        response = client.put(f"/api/v1/walls/{wall_id}", json={"name": "Renamed Test Wall"})
+        assert response.status_code == 200
+        
+        assert client.get(f"/api/v1/walls/{wall_id}").json()["name"] == "Renamed Test Wall"
+    
+    def test_cache_skips_values_read_before_clear(self):
+        """Test a value read before an invalidation is not cached after it"""
+        cache = ResponseCache(ttl_seconds=60, max_entries=10)
+        generation = cache.generation("walls")
+        cache.clear("walls")  # a write commits while the reader awaits the database
+        cache.set("walls", "key", "stale", generation)
+        assert cache.get("walls", "key") is None
+        
+        cache.set("walls", "key", "fresh", cache.generation("walls"))
+        assert cache.get("walls", "key") == "fresh"
+    
     def test_wall_not_found(self):
         """Test 404 for non-existent wall"""
         response = client.get("/api/v1/walls/99999")
@@ -74,18 +115,10 @@ class TestWallsAPI:
 class TestObstaclesAPI:
     """Test obstacle CRUD operations"""
     
-    def test_create_obstacle(self):
+    def test_create_obstacle(self, obstacle_wall):
         """Test obstacle creation"""
-        # First create a wall
-        wall_response = client.post("/api/v1/walls", json={
-            "name": "Test Wall for Obstacle",
-            "width": 5.0,
-            "height": 3.0
-        })
-        wall_id = wall_response.json()["id"]
-        
         start_time = time.time()
-        response = client.post(f"/api/v1/walls/{wall_id}/obstacles", json={
+        response = client.post(f"/api/v1/walls/{obstacle_wall}/obstacles", json={
             "name": "Test Window",
             "obstacle_type": "rectangle",
             "geometry_data": {
@@ -103,6 +136,20 @@ class TestObstaclesAPI:
         data = response.json()
         assert data["name"] == "Test Window"
         assert data["obstacle_type"] == "rectangle"
+    
+    def test_create_obstacles_bulk(self, obstacle_wall):
+        """Test bulk obstacle creation"""
+        response = client.post(f"/api/v1/walls/{obstacle_wall}/obstacles/bulk", json=[
+            {"name": "Window A", "obstacle_type": "rectangle",
+             "geometry_data": {"center_x": 1.0, "center_y": 1.5, "width": 0.5, "height": 0.5}},
+            {"name": "Window B", "obstacle_type": "rectangle",
+             "geometry_data": {"center_x": 4.0, "center_y": 1.5, "width": 0.5, "height": 0.5}}
+        ])
+        
+        assert response.status_code == 201
+        data = response.json()
+        assert [obstacle["name"] for obstacle in data] == ["Window A", "Window B"]
+        assert data[0]["min_x"] == 0.75
 
 class TestPlanningAPI:
     """Test trajectory planning"""
@@ -120,19 +167,11 @@ class TestPlanningAPI:
         assert "algorithms" in data
         assert len(data["algorithms"]) >= 3  # At least 3 algorithms
     
-    def test_plan_trajectory(self):
+    def test_plan_trajectory(self, shared_wall):
         """Test trajectory planning"""
-        # Create wall first
-        wall_response = client.post("/api/v1/walls", json={
-            "name": "Planning Test Wall",
-            "width": 3.0,
-            "height": 3.0
-        })
-        wall_id = wall_response.json()["id"]
-        
         start_time = time.time()
         response = client.post("/api/v1/planning/plan", json={
-            "wall_id": wall_id,
+            "wall_id": shared_wall,
             "algorithm": "boustrophedon",
             "robot_width": 0.1,
             "overlap_percentage": 20.0,
@@ -149,6 +188,62 @@ class TestPlanningAPI:
         assert "total_length" in data
         assert data["total_points"] > 0
 
+def upgrade_legacy_db(tmp_path, monkeypatch, legacy_statements, queries):
+    """Run init_db on a database altered by legacy_statements and return each query's rows"""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    
+    db_path = tmp_path / "legacy.db"
+    legacy_engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(legacy_engine)
+    with legacy_engine.begin() as conn:
+        for statement in legacy_statements:
+            conn.execute(text(statement))
+    legacy_engine.dispose()
+    
+    upgrade_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    monkeypatch.setattr(database, "engine", upgrade_engine)
+    
+    async def upgrade():
+        await init_db()
+        async with upgrade_engine.connect() as conn:
+            results = [(await conn.execute(text(query))).all() for query in queries]
+        await upgrade_engine.dispose()
+        return results
+    
+    return asyncio.run(upgrade())
+
+class TestDatabaseUpgrade:
+    """Test schema upgrades of existing databases"""
+    
+    def test_init_db_upgrades_point_indexes(self, tmp_path, monkeypatch):
+        """Test init_db replaces the pre-covering-index point indexes"""
+        # Recreate the index layout of a database created before idx_tp_seq_cov
+        index_rows, version_rows = upgrade_legacy_db(tmp_path, monkeypatch, [
+            "DROP INDEX idx_tp_seq_cov",
+            "CREATE INDEX idx_trajectory_point_spatial ON trajectory_points(x, y)",
+            "CREATE INDEX idx_trajectory_point_sequence ON trajectory_points(trajectory_id, sequence_number)",
+        ], [
+            "SELECT name FROM pragma_index_list('trajectory_points')",
+            "PRAGMA user_version",
+        ])
+        
+        indexes = {row[0] for row in index_rows}
+        assert "idx_tp_seq_cov" in indexes
+        assert indexes.isdisjoint(database.OBSOLETE_INDEXES)
+        assert version_rows[0][0] == database.SCHEMA_VERSION
+    
+    def test_init_db_converts_text_uuids(self, tmp_path, monkeypatch):
+        """Test init_db rewrites hex text UUIDs from before the GUID type as 16-byte blobs"""
+        legacy_uuid = uuid.uuid4()
+        (row,), = upgrade_legacy_db(tmp_path, monkeypatch, [
+            f"INSERT INTO walls (name, width, height, uuid) VALUES ('Legacy Wall', 5.0, 3.0, '{legacy_uuid.hex}')",
+        ], [
+            "SELECT typeof(uuid), uuid FROM walls",
+        ])
+        
+        assert row == ("blob", legacy_uuid.bytes)
+
 class TestPerformance:
     """Test API performance requirements"""
     
@@ -1,6 +1,7 @@
 # app/utils/geometry.py
 
 import math
+import numpy as np
 from typing import Dict, Any, Tuple, List
 
 class GeometryUtils:
@@ -68,6 +69,25 @@ class GeometryUtils:
         max_y = center_y + radius
         return min_x, min_y, max_x, max_y
     
+    @staticmethod
+    def obstacle_bounds_batch(obstacle_types: List[str], geometries: List[Dict[str, Any]]) -> np.ndarray:
+        """Calculate bounding boxes for many rectangles/circles at once as an (N, 4) min/max array"""
+        count = len(geometries)
+        
+        def column(key: str) -> np.ndarray:
+            return np.fromiter((g.get(key, 0) for g in geometries), dtype=np.float64, count=count)
+        
+        types = np.asarray([str(getattr(t, "value", t)) for t in obstacle_types])
+        is_circle = types == "circle"
+        half_width = np.where(is_circle, column("radius"), column("width") / 2)
+        half_height = np.where(is_circle, column("radius"), column("height") / 2)
+        center_x, center_y = column("center_x"), column("center_y")
+        
+        bounds = np.column_stack((center_x - half_width, center_y - half_height,
+                                  center_x + half_width, center_y + half_height))
+        bounds[~(is_circle | (types == "rectangle"))] = 0.0
+        return bounds
+    
     @staticmethod
     def point_in_rectangle(x: float, y: float, center_x: float, center_y: float, width: float, height: float) -> bool:
         """Check if a point is inside a rectangle"""
@@ -77,8 +97,8 @@ class GeometryUtils:
     @staticmethod
     def point_in_circle(x: float, y: float, center_x: float, center_y: float, radius: float) -> bool:
         """Check if a point is inside a circle"""
-        distance = math.sqrt((x - center_x)**2 + (y - center_y)**2)
-        return distance <= radius
+        dx, dy = x - center_x, y - center_y
+        return dx * dx + dy * dy <= radius * radius
     
     @staticmethod
     def calculate_distance(x1: float, y1: float, x2: float, y2: float) -> float:
@@ -87,9 +107,10 @@ class GeometryUtils:
     
     @staticmethod
     def normalize_angle(angle: float) -> float:
-        """Normalize angle to [-π, π] range"""
-        while angle > math.pi:
-            angle -= 2 * math.pi
-        while angle < -math.pi:
-            angle += 2 * math.pi
-        return angle
\ No newline at end of file
+        """Normalize angle to [-π, π) range"""
+        return (angle + math.pi) % (2 * math.pi) - math.pi
+    
+    @staticmethod
+    def normalize_angles(angles: np.ndarray) -> np.ndarray:
+        """Normalize an array of angles to [-π, π) range"""
+        return np.mod(angles + np.pi, 2 * np.pi) - np.pi
\ No newline at end of file
@@ -1,18 +1,73 @@
 """
 Complete startup script for Wall Finishing Robot Control System
 Handles all setup, initialization, and startup automatically
+
+Set UVICORN_RELOAD=1 to restart the server on code changes during development.
+Pass --fast (or set SKIP_SETUP=1) to go straight to the server when setup completed within the last hour.
 """
 
 import os
 import sys
-import asyncio
-import subprocess
-import time
 from pathlib import Path
 import logging
 
 sys.path.insert(0, str(Path(__file__).parent.resolve()))
 
+DEPS_STAMP = Path("data/.deps_ok")
+SETUP_STAMP = Path("data/.setup_ok")
+SETUP_STAMP_MAX_AGE = 3600  # seconds
+REQUIRED_DIRS = ("data/database", "data/exports", "logs", "app/static")
+ENV_TEMPLATE = b"""# Wall Finishing Robot Control System Configuration
+DATABASE_URL=sqlite+aiosqlite:///./data/database/robot_control.db
+DATABASE_POOL_SIZE=20
+DATABASE_MAX_OVERFLOW=0
+API_VERSION=v1
+API_TITLE=Wall Finishing Robot Control System
+SECRET_KEY=production-secret-key-change-this
+ACCESS_TOKEN_EXPIRE_MINUTES=30
+DEBUG=true
+TESTING=false
+LOG_LEVEL=INFO
+LOG_FILE=logs/app.log
+LOG_MAX_BYTES=10485760
+LOG_BACKUP_COUNT=5
+MAX_TRAJECTORY_POINTS=100000
+CACHE_TTL_SECONDS=300
+REQUEST_TIMEOUT_SECONDS=30
+ROBOT_WIDTH_CM=10.0
+OVERLAP_PERCENTAGE=20.0
+PATH_RESOLUTION_CM=1.0
+ENABLE_METRICS=true
+METRICS_PORT=9090
+HEALTH_CHECK_INTERVAL=30
+"""
+
+BANNER = "\n".join((
+    "=" * 60,
+    "🤖 WALL FINISHING ROBOT CONTROL SYSTEM",
+    "🔧 Production-Ready Path Planning & Visualization",
+    "📊 SQLite Database with Advanced Optimization",
+    "🎯 Complete Sample Case: 5m×5m Wall + 25cm×25cm Window",
+    "=" * 60,
+)) + "\n"
+
+READY_MESSAGE = "\n".join((
+    "",
+    "=" * 50,
+    "🌐 SYSTEM READY!",
+    "=" * 50,
+    "📍 Web Interface:     http://localhost:8000",
+    "📚 API Documentation: http://localhost:8000/docs",
+    "📊 System Status:     http://localhost:8000/api/v1/monitoring/system-status",
+    "🏥 Health Check:      http://localhost:8000/health",
+    "=" * 50,
+    "⏹️  Press Ctrl+C to stop the server",
+    "",
+)) + "\n"
+
+# Everything app.core.database needs at import time
+DATABASE_PACKAGES = ("sqlalchemy", "aiosqlite", "pydantic_settings", "orjson")
+
 def setup_logging():
     """Setup basic logging for startup script"""
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -20,12 +75,8 @@ def setup_logging():
 
 def print_banner():
     """Print startup banner"""
-    print("=" * 60)
-    print("🤖 WALL FINISHING ROBOT CONTROL SYSTEM")
-    print("🔧 Production-Ready Path Planning & Visualization")
-    print("📊 SQLite Database with Advanced Optimization")
-    print("🎯 Complete Sample Case: 5m×5m Wall + 25cm×25cm Window")
-    print("=" * 60)
+    sys.stdout.write(BANNER)
+    sys.stdout.flush()
 
 def check_python_and_setup():
     """Check Python version and setup directories"""
@@ -37,144 +88,203 @@ def check_python_and_setup():
     
     logger.info("✅ Python version: %s", sys.version.split()[0])
     
-    # Create directories
-    for dir_path in ["data/database", "data/exports", "logs", "app/static"]:
-        Path(dir_path).mkdir(parents=True, exist_ok=True)
-    logger.info("✅ Directories created")
+    # Create directories, unless a previous run already did
+    if all(os.path.isdir(dir_path) for dir_path in REQUIRED_DIRS):
+        logger.info("✅ Directories present")
+    else:
+        for dir_path in REQUIRED_DIRS:
+            os.makedirs(dir_path, exist_ok=True)
+        logger.info("✅ Directories created")
+    
+    # Byte-compile the app ahead of the server's first import; up-to-date files are skipped
+    import compileall
+    if compileall.compile_dir("app", quiet=1):
+        logger.info("✅ Application bytecode up to date")
+    else:
+        logger.warning("⚠️  Some application modules failed to compile")
     
     return True
 
+def pinned_requirements(requirements, packages):
+    """Return the requirements.txt lines for the given packages, falling back to bare names"""
+    import re
+    pins = {}
+    if requirements.exists():
+        for line in requirements.read_text().splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                pins[re.split(r"[\[=<>!~;\s]", line, 1)[0].lower().replace("_", "-")] = line
+    return [pins.get(package, package) for package in packages]
+
+def is_installed(name):
+    """Whether a top-level package is importable, without importing it"""
+    import importlib.util
+    # Already loaded modules need no lookup; find_spec only locates the rest, nothing is executed
+    return name in sys.modules or importlib.util.find_spec(name) is not None
+
 def check_and_install_dependencies():
     """Check if required packages are installed and install if missing"""
+    import hashlib
+    import subprocess
     logger = logging.getLogger(__name__)
     
-    required_packages = ['fastapi', 'uvicorn', 'sqlalchemy', 'aiosqlite', 
-                        'pydantic', 'pydantic-settings', 'numpy', 'shapely', 'psutil']
+    # Skip the probe when this interpreter already satisfied the current requirements.txt
+    requirements = Path("requirements.txt")
+    fingerprint = hashlib.sha256((requirements.read_bytes() if requirements.exists() else b"") +
+                                 sys.executable.encode() + sys.version.encode()).hexdigest()
+    if DEPS_STAMP.exists() and DEPS_STAMP.read_text() == fingerprint:
+        logger.info("✅ Dependencies unchanged since last check")
+        return True
     
-    missing_packages = []
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
-            missing_packages.append(package)
+    required_packages = ['fastapi', 'uvicorn', 'sqlalchemy', 'aiosqlite', 'orjson',
+                        'pydantic', 'pydantic-settings', 'numpy', 'shapely', 'psutil', 'httptools']
+    # start_server runs uvicorn on uvloop everywhere but Windows
+    if sys.platform != "win32":
+        required_packages.append('uvloop')
+    
+    missing_packages = [package for package in required_packages
+                        if not is_installed(package.replace('-', '_'))]
     
     if missing_packages:
-        logger.info("📦 Installing missing dependencies...")
+        logger.info("📦 Installing missing dependencies: %s", ", ".join(missing_packages))
+        pip_install = [sys.executable, "-m", "pip", "install", "--quiet", "--disable-pip-version-check"]
         try:
-            subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], 
-                         check=True, capture_output=True, text=True)
-            logger.info("✅ Dependencies installed successfully")
+            subprocess.run([*pip_install, *pinned_requirements(requirements, missing_packages)],
+                         check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         except subprocess.CalledProcessError as e:
-            logger.error("❌ Failed to install dependencies: %s", e.stderr)
-            return False
+            if not requirements.exists():
+                logger.error("❌ Failed to install dependencies: %s", e.stderr.decode(errors="replace"))
+                return False
+            # The targeted install can fail on an unpinned name; let pip resolve the full requirements instead
+            logger.warning("⚠️  Targeted install failed, installing from requirements.txt")
+            try:
+                subprocess.run([*pip_install, "-r", str(requirements)],
+                             check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            except subprocess.CalledProcessError as e:
+                logger.error("❌ Failed to install dependencies: %s", e.stderr.decode(errors="replace"))
+                return False
+        logger.info("✅ Dependencies installed successfully")
     else:
         logger.info("✅ All dependencies already installed")
     
+    DEPS_STAMP.write_text(fingerprint)
     return True
 
 async def initialize_database():
     """Initialize the SQLite database"""
     logger = logging.getLogger(__name__)
     try:
-        from app.core.database import init_db
+        from app import init_db, engine
+        import app.models.database_models  # noqa: F401 - registers the tables on Base.metadata
         logger.info("🗄️  Initializing SQLite database...")
         await init_db()
+        # The server runs in this process on a new event loop; don't hand it connections bound to this one
+        await engine.dispose()
         logger.info("✅ Database initialized with optimized indexes")
         return True
     except Exception as e:
         logger.error("❌ Database initialization failed: %s", e)
         return False
 
+async def run_setup_tasks():
+    """Create .env and install missing dependencies concurrently, initializing the database alongside"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    install = loop.run_in_executor(None, check_and_install_dependencies)
+    # Settings read .env when app.config is first imported, so the database waits for it
+    await loop.run_in_executor(None, check_files_and_create_env)
+    
+    if all(is_installed(package) for package in DATABASE_PACKAGES):
+        dependencies_ok, database_ok = await asyncio.gather(install, initialize_database())
+        return dependencies_ok and database_ok
+    
+    # The database layer itself is being installed, so it has to wait for pip
+    if not await install:
+        return False
+    return await initialize_database()
+
 def check_files_and_create_env():
     """Check HTML file and create .env file if needed"""
     logger = logging.getLogger(__name__)
     
     # Check HTML file
-    if Path("app/static/index.html").exists():
+    if os.path.isfile("app/static/index.html"):
         logger.info("✅ Frontend HTML file found")
     else:
         logger.warning("⚠️  Frontend HTML file not found - place index.html in app/static/")
     
-    # Create .env file if needed
-    env_path = Path(".env")
-    if not env_path.exists():
-        logger.info("📝 Creating .env configuration file...")
-        env_content = """# Wall Finishing Robot Control System Configuration
-DATABASE_URL=sqlite+aiosqlite:///./data/database/robot_control.db
-DATABASE_POOL_SIZE=20
-DATABASE_MAX_OVERFLOW=0
-API_VERSION=v1
-API_TITLE=Wall Finishing Robot Control System
-SECRET_KEY=production-secret-key-change-this
-ACCESS_TOKEN_EXPIRE_MINUTES=30
-DEBUG=true
-TESTING=false
-LOG_LEVEL=INFO
-LOG_FILE=logs/app.log
-LOG_MAX_BYTES=10485760
-LOG_BACKUP_COUNT=5
-MAX_TRAJECTORY_POINTS=100000
-CACHE_TTL_SECONDS=300
-REQUEST_TIMEOUT_SECONDS=30
-ROBOT_WIDTH_CM=10.0
-OVERLAP_PERCENTAGE=20.0
-PATH_RESOLUTION_CM=1.0
-ENABLE_METRICS=true
-METRICS_PORT=9090
-HEALTH_CHECK_INTERVAL=30
-"""
-        with open(env_path, 'w') as f:
-            f.write(env_content)
-        logger.info("✅ .env file created with default configuration")
-    else:
+    # Create .env file if needed; O_EXCL makes the existence check and the create one step
+    try:
+        fd = os.open(".env", os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
         logger.info("✅ .env file already exists")
+        return
+    logger.info("📝 Creating .env configuration file...")
+    try:
+        os.write(fd, ENV_TEMPLATE)
+    finally:
+        os.close(fd)
+    logger.info("✅ .env file created with default configuration")
 
 def start_server():
     """Start the FastAPI server"""
+    import uvicorn
     logger = logging.getLogger(__name__)
     
     logger.info("🚀 Starting Wall Finishing Robot Control System...")
-    print("\n" + "=" * 50)
-    print("🌐 SYSTEM READY!")
-    print("=" * 50)
-    print("📍 Web Interface:     http://localhost:8000")
-    print("📚 API Documentation: http://localhost:8000/docs")
-    print("📊 System Status:     http://localhost:8000/api/v1/monitoring/system-status")
-    print("🏥 Health Check:      http://localhost:8000/health")
-    print("=" * 50)
-    print("⏹️  Press Ctrl+C to stop the server\n")
+    sys.stdout.write(READY_MESSAGE)
+    sys.stdout.flush()
     
     try:
-        subprocess.run([sys.executable, "-m", "uvicorn", "app.main:app", "--reload", 
-                       "--host", "0.0.0.0", "--port", "8000", "--log-level", "info"])
+        # Serve from this interpreter so the already imported modules are reused
+        loop = "asyncio" if sys.platform == "win32" else "uvloop"
+        reload = os.environ.get("UVICORN_RELOAD", "0") == "1"
+        uvicorn.run("app.main:app", reload=reload, host="0.0.0.0", port=8000, loop=loop, http="httptools")
     except KeyboardInterrupt:
         print("\n👋 Shutting down system...")
         logger.info("System shut down by user")
 
+def setup_recently_completed():
+    """Whether a fast start was requested and the last full setup is recent enough to trust"""
+    import time
+    if "--fast" not in sys.argv[1:] and os.environ.get("SKIP_SETUP", "0") != "1":
+        return False
+    try:
+        return time.time() - SETUP_STAMP.stat().st_mtime < SETUP_STAMP_MAX_AGE
+    except FileNotFoundError:
+        return False
+
 def main():
     """Main startup function"""
     logger = setup_logging()
+    
+    # Warm restarts skip straight to the server; the app lifespan still runs init_db
+    if setup_recently_completed():
+        logger.info("⏩ Setup completed recently, skipping checks")
+        start_server()
+        return
+    
     print_banner()
     
     # Check Python version and setup directories
     if not check_python_and_setup():
         sys.exit(1)
     
-    # Create .env and check files
-    check_files_and_create_env()
-    
-    # Check and install dependencies
-    if not check_and_install_dependencies():
-        logger.error("❌ Dependency installation failed")
-        sys.exit(1)
-    
-    # Initialize database
+    # Create .env, check files and install dependencies, initializing the database in parallel
+    import asyncio
     try:
-        asyncio.run(initialize_database())
+        setup_ok = asyncio.run(run_setup_tasks())
     except Exception as e:
-        logger.error("❌ Database initialization failed: %s", e)
+        logger.error("❌ Setup failed: %s", e)
+        sys.exit(1)
+    
+    # Each step logs its own failure; don't stamp a setup that did not complete
+    if not setup_ok:
+        logger.error("❌ Dependency installation or database initialization failed")
         sys.exit(1)
     
+    SETUP_STAMP.touch()
+    
     # Start server
     start_server()
 